@@ -2,6 +2,8 @@ from password_gate import require_password
 require_password()
 import streamlit as st
 
+import metrics
+
 def recruitment_hub_page():
     # --- Page Configuration ---
     st.set_page_config(
@@ -84,4 +86,6 @@ def recruitment_hub_page():
 
 # Run the page function
 if __name__ == "__main__":
-    recruitment_hub_page()
\ No newline at end of file
+    metrics.start_trace("home")
+    recruitment_hub_page()
+    metrics.end_trace()
\ No newline at end of file
@@ -0,0 +1,561 @@
+# advert_pipeline.py
+# Job advert extraction and optimisation helpers shared by the Job advert optimiser page
+# and the bulk ingestion CLI (ingest.py). Nothing in here touches Streamlit: failures
+# raise, and the callers decide how to report them.
+#
+# The parsers (bs4, python-docx, pypdf) and the OpenAI SDK are imported on first use,
+# so loading this module stays cheap on a cold start.
+import hashlib
+import importlib
+import json
+import math
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from io import BytesIO
+
+import metrics
+import openai_gateway
+from cache import TieredCache, llm_cache, llm_key, make_key
+from pdf_extract import PDF_MAX_CHARS, PDF_MAX_PAGES, extract_pdf_text
+from rule_extract import normalise_date, pre_extract
+
+TARGET_SCHEMA = {
+    "job_title": "",
+    "department": "",
+    "location": "",
+    "salary": "",
+    "grade": "",
+    "closing_date": "",
+    "summary": "",
+    "responsibilities": "",
+    "essential_criteria": "",
+    "desirable_criteria": ""
+}
+
+# content fields we want to optimise
+CONTENT_FIELDS = [
+    "summary",
+    "responsibilities",
+    "essential_criteria",
+    "desirable_criteria",
+]
+
+SUPPORTED_EXTENSIONS = (".txt", ".docx", ".pdf", ".html", ".htm")
+
+# bump this when document parsing changes so cached upload text is not reused
+PARSER_VERSION = "1"
+
+# bump these when a prompt changes so cached LLM results are not reused
+STRUCTURER_PROMPT_VERSION = "1"
+OPTIMISER_PROMPT_VERSION = "1"
+PIPELINE_PROMPT_VERSION = "1"
+
+# long adverts are split into chunks of roughly this many tokens and extracted in parallel
+STRUCTURER_CHUNK_TOKENS = int(os.getenv("STRUCTURER_CHUNK_TOKENS", "3000"))
+STRUCTURER_MAX_WORKERS = int(os.getenv("STRUCTURER_MAX_WORKERS", "4"))
+CHARS_PER_TOKEN = 4  # rough average for English text
+
+# how partial schemas from different chunks are combined; fields not listed take the
+# first non-empty value in document order
+MERGE_RULES = {
+    "responsibilities": "longest",
+    "essential_criteria": "longest",
+    "desirable_criteria": "longest",
+}
+
+# a short line ending in a colon, or in title/upper case, starts a new section
+SECTION_HEADING = re.compile(r"^(?:[^\n]{1,60}:|[A-Z][A-Za-z'&/ -]{1,60})$")
+
+# concurrent optimisation settings
+OPTIMISE_MAX_WORKERS = int(os.getenv("OPTIMISE_MAX_WORKERS", "4"))
+OPTIMISE_FIELD_TIMEOUT = float(os.getenv("OPTIMISE_FIELD_TIMEOUT", "30"))  # seconds
+
+
+class ExtractionError(Exception):
+    """A document couldn't be parsed or the model's answer couldn't be used."""
+
+
+# parsed upload text keyed by content digest, so reruns never re-parse the same file
+parse_cache = TieredCache(
+    "parse",
+    max_items=int(os.getenv("PARSE_CACHE_ITEMS", "64")),
+    max_memory_bytes=int(os.getenv("PARSE_CACHE_MEMORY_BYTES", str(32 * 1024 * 1024))),
+    max_disk_bytes=int(os.getenv("PARSE_CACHE_MAX_BYTES", str(100 * 1024 * 1024))),
+    path=None if os.getenv("PARSE_CACHE_DISK", "1") == "1" else "",
+)
+
+
+# --------------------------
+# TEXT EXTRACTION
+# --------------------------
+def extract_text_from_bytes(name: str, data: bytes) -> str:
+    """Plain text from an uploaded document, chosen by file extension ("" if unsupported).
+
+    DOCX, PDF and HTML results are cached by SHA-256 of the bytes and the parser version,
+    except PDF text cut short by PDF_TIMEOUT, so a later upload gets another try.
+    """
+    name = name.lower()
+    if name.endswith(".txt"):
+        return _parse_bytes(name, data)
+
+    ext = os.path.splitext(name)[1]
+    key = make_key("parse", PARSER_VERSION, ext, PDF_MAX_PAGES, PDF_MAX_CHARS, hashlib.sha256(data).hexdigest())
+    cached = parse_cache.get(key)
+    if cached is not None:
+        return cached
+
+    status = {}
+    with metrics.stage(f"parse.{ext.lstrip('.') or 'unknown'}"):
+        text = _parse_bytes(name, data, status)
+    if text and not status.get("timed_out"):
+        parse_cache.set(key, text)
+    return text
+
+
+def _optional(module: str):
+    """An optional parser module, imported on first use; None if it isn't installed."""
+    try:
+        return importlib.import_module(module)
+    except ImportError:
+        return None
+
+
+def _parse_bytes(name: str, data: bytes, status: dict = None) -> str:
+    if name.endswith(".txt"):
+        try:
+            return data.decode("utf-8", errors="ignore")
+        except Exception:
+            return data.decode("latin-1", errors="ignore")
+
+    if name.endswith(".docx"):
+        docx = _optional("docx")  # python-docx
+        if not docx:
+            raise ExtractionError("DOCX support not installed. Add python-docx to requirements.")
+        try:
+            document = docx.Document(BytesIO(data))
+            return "\n".join(p.text for p in document.paragraphs)
+        except Exception as e:
+            raise ExtractionError(f"Could not parse DOCX: {e}") from e
+
+    if name.endswith(".pdf"):
+        if not _optional("pypdf"):
+            raise ExtractionError("PDF support not installed. Add pypdf to requirements.")
+        try:
+            return extract_pdf_text(data, status=status)
+        except Exception as e:
+            raise ExtractionError(f"Could not parse PDF: {e}") from e
+
+    if name.endswith((".html", ".htm")):
+        return html_to_text(data.decode("utf-8", errors="replace"))
+
+    return ""
+
+
+def normalise_url(url: str) -> str:
+    if not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+    return url
+
+
+@metrics.timed("parse.html")
+def html_to_text(html: str) -> str:
+    """Main readable text of an advert page, without scripts and page chrome."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+
+    for elem in soup(["script", "style", "noscript", "header", "footer", "nav"]):
+        elem.decompose()
+
+    main_content = (
+        soup.find('main') or
+        soup.find('article') or
+        soup.find('div', class_='content') or
+        soup
+    )
+
+    return main_content.get_text(separator="\n", strip=True)
+
+
+# --------------------------
+# STRUCTURED EXTRACTION
+# --------------------------
+def split_into_chunks(text: str, max_tokens: int = STRUCTURER_CHUNK_TOKENS) -> list:
+    """Split text on section boundaries into chunks of at most ~max_tokens each."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return [text]
+
+    # sections start at blank lines or heading-like lines
+    sections, current = [], []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if current and (not stripped or SECTION_HEADING.match(stripped)):
+            sections.append("\n".join(current))
+            current = []
+        if stripped:
+            current.append(line)
+    if current:
+        sections.append("\n".join(current))
+
+    # an oversized section is cut at line, then character, boundaries
+    pieces = []
+    for section in sections:
+        while len(section) > max_chars:
+            cut = section.rfind("\n", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            pieces.append(section[:cut])
+            section = section[cut:].lstrip("\n")
+        pieces.append(section)
+
+    chunks, buf = [], ""
+    for section in pieces:
+        if buf and len(buf) + 1 + len(section) > max_chars:
+            chunks.append(buf)
+            buf = ""
+        buf = f"{buf}\n{section}" if buf else section
+    if buf:
+        chunks.append(buf)
+    return chunks
+
+
+def merge_partial_schemas(partials: list, schema: dict) -> dict:
+    """Combine per-chunk results field by field using MERGE_RULES."""
+    merged = dict(schema)
+    for field in schema:
+        values = [normalise_schema(p)[field].strip() for p in partials]
+        values = [v for v in values if v]
+        if not values:
+            continue
+        if MERGE_RULES.get(field) == "longest":
+            merged[field] = max(values, key=len)
+        else:
+            merged[field] = values[0]
+    return merged
+
+
+def structure_advert(raw_text: str, schema: dict) -> dict:
+    """Fill `schema` from the advert text.
+
+    Fields the rule-based pre-extractor can read are taken from it, and OpenAI is
+    only asked for the rest (or not called at all). API errors propagate; an answer
+    that isn't a JSON object raises ExtractionError.
+    """
+    found = {k: v for k, v in pre_extract(raw_text).items() if k in schema}
+    remaining = {k: v for k, v in schema.items() if k not in found}
+
+    result = dict(schema)
+    if remaining:
+        result.update(_structure_with_llm(raw_text, remaining))
+    result.update(found)
+
+    if result.get("closing_date"):
+        result["closing_date"] = normalise_date(str(result["closing_date"])) or result["closing_date"]
+    return result
+
+
+def _structure_with_llm(raw_text: str, schema: dict) -> dict:
+    # text longer than STRUCTURER_CHUNK_TOKENS is split on section boundaries, the
+    # chunks are extracted in parallel and the partial results merged
+    chunks = split_into_chunks(raw_text)
+    if len(chunks) == 1:
+        return _structure_chunk(raw_text, schema)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(STRUCTURER_MAX_WORKERS, len(chunks)))) as executor:
+        futures = [executor.submit(metrics.bind(_structure_chunk), chunk, schema) for chunk in chunks]
+    partials, errors = [], []
+    for future in futures:
+        try:
+            partials.append(future.result())
+        except Exception as e:
+            errors.append(e)
+    if not partials:
+        raise errors[0]
+    return merge_partial_schemas(partials, schema)
+
+
+def _structure_chunk(raw_text: str, schema: dict) -> dict:
+    schema_str = json.dumps(schema, indent=2)
+    prompt = f"""
+You are an information extraction assistant for UK Civil Service job adverts.
+Extract as many fields as you can from the text below and return ONLY valid JSON matching this schema.
+If you don't know a field, leave it as an empty string.
+
+Schema:
+{schema_str}
+
+Text:
+\"\"\"{raw_text}\"\"\"
+"""
+    cache_key = llm_key("gpt-3.5-turbo", 0, STRUCTURER_PROMPT_VERSION, prompt)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        return dict(cached)
+
+    resp = openai_gateway.create(
+        "chat.completions",
+        model="gpt-3.5-turbo",
+        messages=[
+            {"role": "system", "content": "You convert unstructured job adverts into structured JSON."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0
+    )
+    parsed = _json_object_from(resp)
+    llm_cache.set(cache_key, parsed)
+    return parsed
+
+
+def _json_object_from(resp) -> dict:
+    raw_json = ""
+    try:
+        raw_json = resp.choices[0].message.content.strip()
+    except Exception:
+        try:
+            raw_json = str(resp.choices[0].message).strip()
+        except Exception:
+            raw_json = ""
+
+    try:
+        parsed = json.loads(raw_json)
+    except Exception:
+        cleaned = raw_json.strip("` \n")
+        try:
+            parsed = json.loads(cleaned)
+        except Exception as e:
+            raise ExtractionError("The model did not return valid JSON") from e
+
+    if not isinstance(parsed, dict):
+        raise ExtractionError("The model did not return a JSON object")
+    return parsed
+
+
+def normalise_schema(extracted: dict) -> dict:
+    """Exactly the TARGET_SCHEMA keys, each as a string."""
+    out = {}
+    for k in TARGET_SCHEMA:
+        v = extracted.get(k, "")
+        if isinstance(v, list):
+            v = "\n".join(str(item) for item in v)
+        out[k] = "" if v is None else str(v)
+    return out
+
+
+def get_missing_fields(current_schema: dict):
+    return [k for k, v in current_schema.items() if not v or not str(v).strip()]
+
+
+# --------------------------
+# COMBINED EXTRACT + OPTIMISE
+# --------------------------
+def extract_and_optimise(raw_text: str, schema: dict) -> tuple:
+    """Structured fields and optimised content fields from one LLM round trip.
+
+    Returns (extracted, optimised). Rule-based fields are still taken from
+    pre_extract. Adverts too long for a single prompt fall back to structure_advert
+    followed by optimise_fields. API errors propagate; an unusable answer raises
+    ExtractionError.
+
+    The call runs at temperature 0, like structure_advert, so the extracted fields
+    stay deterministic; the rewrites come out more literal than the per-field
+    optimiser's.
+    """
+    if len(split_into_chunks(raw_text)) > 1:
+        extracted = structure_advert(raw_text, schema)
+        optimised, _ = optimise_fields(extracted)
+        return extracted, optimised
+
+    found = {k: v for k, v in pre_extract(raw_text).items() if k in schema}
+    remaining = {k: v for k, v in schema.items() if k not in found}
+    content = [cf for cf in CONTENT_FIELDS if cf in schema]
+
+    prompt = f"""
+You are an information extraction assistant and editor for UK Civil Service job adverts.
+Read the text below and return ONLY a valid JSON object with two keys:
+
+"fields": a JSON object matching this schema. If you don't know a field, leave it as an empty string.
+{json.dumps(remaining, indent=2)}
+
+"optimised": a JSON object with the keys {json.dumps(content)}. For each one, rewrite that part
+of the advert for a UK Civil Service style job advert:
+- keep the meaning
+- improve clarity and readability
+- use bullets for lists of more than three items
+- do NOT invent salary, grade, dates or department
+Use an empty string where the advert has no such content.
+
+Text:
+\"\"\"{raw_text}\"\"\"
+"""
+    cache_key = llm_key("gpt-3.5-turbo", 0, PIPELINE_PROMPT_VERSION, prompt)
+    parsed = llm_cache.get(cache_key)
+    if parsed is None:
+        resp = openai_gateway.create(
+            "chat.completions",
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": "You convert unstructured job adverts into structured, improved JSON."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0,
+            response_format={"type": "json_object"},
+        )
+        parsed = _json_object_from(resp)
+        if not isinstance(parsed.get("fields"), dict) or not isinstance(parsed.get("optimised"), dict):
+            raise ExtractionError("The model did not return fields and optimised content")
+        llm_cache.set(cache_key, parsed)
+
+    extracted = dict(schema)
+    extracted.update({k: v for k, v in parsed["fields"].items() if k in remaining})
+    extracted.update(found)
+    if extracted.get("closing_date"):
+        extracted["closing_date"] = normalise_date(str(extracted["closing_date"])) or extracted["closing_date"]
+
+    # only keep suggestions for content the advert actually has
+    optimised = {}
+    for cf in content:
+        value = parsed["optimised"].get(cf, "")
+        if isinstance(value, list):
+            value = "\n".join(str(item) for item in value)
+        suggestion = str(value or "").strip()
+        if suggestion and str(extracted.get(cf, "")).strip():
+            optimised[cf] = suggestion
+    return extracted, optimised
+
+
+# --------------------------
+# CONTENT OPTIMISATION
+# --------------------------
+def _optimiser_prompt(field_name: str, text: str) -> str:
+    return f"""
+Rewrite the following {field_name.replace('_', ' ')} for a UK Civil Service style job advert.
+- keep the meaning
+- improve clarity and readability
+- user bullets for lists of more than three items
+- do NOT invent salary, grade, dates or department
+Return only the rewritten text.
+Text:
+{text}
+    """.strip()
+
+
+def request_optimisation(field_name: str, text: str, timeout: float = None) -> str:
+    """Ask OpenAI for a rewrite of a single content field. Raises on failure."""
+    prompt = _optimiser_prompt(field_name, text)
+    cache_key = llm_key("gpt-3.5-turbo", 0.3, OPTIMISER_PROMPT_VERSION, prompt)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    resp = openai_gateway.create(
+        "chat.completions",
+        model="gpt-3.5-turbo",
+        messages=[
+            {"role": "system", "content": "You improve job-advert text."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.3,
+        timeout=timeout,
+    )
+    rewritten = resp.choices[0].message.content.strip()
+    llm_cache.set(cache_key, rewritten)
+    return rewritten
+
+
+def stream_optimisation(field_name: str, text: str, timeout: float = None):
+    """Yield the rewrite of a single content field as tokens arrive. Raises on failure."""
+    prompt = _optimiser_prompt(field_name, text)
+    cache_key = llm_key("gpt-3.5-turbo", 0.3, OPTIMISER_PROMPT_VERSION, prompt)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        yield cached
+        return
+
+    stream = openai_gateway.create(
+        "chat.completions",
+        model="gpt-3.5-turbo",
+        messages=[
+            {"role": "system", "content": "You improve job-advert text."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.3,
+        timeout=timeout,
+        stream=True,
+        # a final chunk with token usage, for metrics and the rate limiter
+        stream_options={"include_usage": True},
+    )
+    parts = []
+    for chunk in stream:
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if delta:
+            parts.append(delta)
+            yield delta
+    llm_cache.set(cache_key, "".join(parts).strip())
+
+
+def optimise_single_field(field_name: str, text: str) -> str:
+    """Call OpenAI to optimise a single content field."""
+    try:
+        return request_optimisation(field_name, text)
+    except Exception:
+        return text
+
+
+def _collect_stream(field_name: str, text: str, timeout: float, partial: dict) -> str:
+    # runs in a worker thread; the caller renders `partial` as it grows
+    parts = []
+    for delta in stream_optimisation(field_name, text, timeout):
+        parts.append(delta)
+        partial[field_name] = "".join(parts)
+    return "".join(parts).strip()
+
+
+def optimise_fields(fields: dict, timeout: float = OPTIMISE_FIELD_TIMEOUT, placeholders: dict = None) -> tuple:
+    """Optimise several content fields concurrently.
+
+    Returns (suggestions, failed). Suggestions are ordered as in CONTENT_FIELDS;
+    a field that errors, or whose request runs past `timeout`, is left out and
+    listed in `failed` so the other results are still kept. If `placeholders` maps
+    fields to `st.empty()` slots, each rewrite is streamed into its slot as it is
+    written.
+    """
+    todo = [(f, fields[f]) for f in CONTENT_FIELDS if fields.get(f)]
+    if not todo:
+        return {}, []
+
+    workers = max(1, min(OPTIMISE_MAX_WORKERS, len(todo)))
+    executor = ThreadPoolExecutor(max_workers=workers)
+    # fields beyond the first `workers` queue for a free worker, so the batch gets
+    # `timeout` for each round of workers it needs
+    deadline = time.monotonic() + timeout * math.ceil(len(todo) / workers)
+    if placeholders:
+        partial = {}
+        futures = {f: executor.submit(metrics.bind(_collect_stream), f, text, timeout, partial) for f, text in todo}
+        while time.monotonic() < deadline and not all(fut.done() for fut in futures.values()):
+            for f, slot in placeholders.items():
+                if f in partial:
+                    slot.markdown(partial[f])
+            time.sleep(0.1)
+    else:
+        futures = {f: executor.submit(metrics.bind(request_optimisation), f, text, timeout) for f, text in todo}
+
+    suggestions, failed = {}, []
+    try:
+        for f, _ in todo:
+            try:
+                suggestions[f] = futures[f].result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                futures[f].cancel()
+                failed.append(f)
+            except Exception:
+                failed.append(f)
+    finally:
+        # don't block the caller on stragglers; the request timeout ends them
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    if placeholders:
+        for f, suggestion in suggestions.items():
+            placeholders[f].markdown(suggestion)
+    return suggestions, failed
@@ -0,0 +1,150 @@
+# background.py
+# Process-wide executor for slow work (LLM calls), so it runs off the Streamlit script
+# thread. A page submits a function and keeps the returned job id in session state.
+# The job carries on through reruns, tab switches and navigation; the page polls it
+# (from an auto-refreshing st.fragment) and attaches the result to its session once
+# it is done. Every job belongs to one session, and other sessions can't read it.
+# Nothing in here touches Streamlit.
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+BACKGROUND_WORKERS = int(os.getenv("BACKGROUND_WORKERS", "8"))
+BACKGROUND_JOB_TTL = float(os.getenv("BACKGROUND_JOB_TTL", "3600"))  # seconds a finished job is kept
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class Job:
+    """One piece of background work and, once finished, its result or error.
+
+    `progress` holds partial output (e.g. streamed text) keyed by slot; the
+    function writes to it through job.slot(key) while it runs.
+    """
+
+    def __init__(self, owner: str, kind: str, meta: dict = None):
+        self.id = uuid.uuid4().hex
+        self.owner = owner
+        self.kind = kind
+        self.meta = meta or {}
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.progress = {}
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self._future = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def elapsed(self) -> float:
+        return (self.finished or time.time()) - (self.started or self.submitted)
+
+    def slot(self, key):
+        """A stand-in for an st.empty() slot: whatever is written to it lands in progress[key]."""
+        return ProgressSlot(self, key)
+
+
+class ProgressSlot:
+    def __init__(self, job: Job, key):
+        self.job = job
+        self.key = key
+
+    def markdown(self, text: str):
+        self.job.progress[self.key] = text
+
+
+def collect_stream(chunks, slot: ProgressSlot) -> str:
+    """Join streamed text chunks, keeping `slot` up to date as they arrive."""
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        slot.markdown("".join(parts))
+    return "".join(parts).strip()
+
+
+class BackgroundExecutor:
+    """A bounded thread pool that tracks its work as jobs with ids and owners."""
+
+    def __init__(self, max_workers: int = BACKGROUND_WORKERS, job_ttl: float = BACKGROUND_JOB_TTL):
+        self.max_workers = max_workers
+        self.job_ttl = job_ttl
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="background")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, owner: str, kind: str, fn, meta: dict = None) -> str:
+        """Run `fn(job)` in the background and return the job id.
+
+        Work beyond `max_workers` jobs waits in the queue. Whatever `fn` returns
+        becomes job.result; an exception marks the job failed with job.error set.
+        """
+        job = Job(owner, kind, meta)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        # the job keeps the trace id of the page run that submitted it
+        job._future = self._pool.submit(metrics.bind(self._run), job, fn)
+        return job.id
+
+    @staticmethod
+    def _run(job: Job, fn):
+        job.status = RUNNING
+        job.started = time.time()
+        metrics.observe("job.queued", job.started - job.submitted)
+        try:
+            with metrics.stage(f"job.{job.kind}"):
+                job.result = fn(job)
+            job.status = DONE
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            job.status = FAILED
+        finally:
+            job.finished = time.time()
+
+    def get(self, job_id: str, owner: str):
+        """The job, if it exists and belongs to `owner`; otherwise None."""
+        job = self._jobs.get(job_id)
+        return job if job is not None and job.owner == owner else None
+
+    def cancel(self, job_id: str, owner: str) -> bool:
+        """Drop a job that hasn't started yet. Running jobs finish, but their results go unused."""
+        job = self.get(job_id, owner)
+        if job is None:
+            return False
+        cancelled = job._future.cancel()
+        with self._lock:
+            self._jobs.pop(job_id, None)
+        return cancelled
+
+    def stats(self) -> dict:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        counts = {status: 0 for status in (QUEUED, RUNNING, DONE, FAILED)}
+        for job in jobs:
+            counts[job.status] += 1
+        return {"workers": self.max_workers, **counts}
+
+    def _prune(self):
+        cutoff = time.time() - self.job_ttl
+        for job_id in [j.id for j in self._jobs.values() if j.done and j.finished < cutoff]:
+            del self._jobs[job_id]
+
+
+def session_owner(state) -> str:
+    """The owner id for a Streamlit session, kept in its session_state."""
+    if "background_owner" not in state:
+        state["background_owner"] = uuid.uuid4().hex
+    return state["background_owner"]
+
+
+# one executor per process, shared by every page and session
+executor = BackgroundExecutor()
+metrics.register_gauges("background_jobs", executor.stats)
@@ -0,0 +1,96 @@
+# benchmarks/bench_cold_start.py
+# Cold-start cost of every page, with a budget. Each page is run once, authenticated,
+# through Streamlit's AppTest in a fresh interpreter that has already imported
+# streamlit (the server always has), and the script measures:
+#   - how long that first run takes, and
+#   - which heavy third-party modules it pulled in.
+# A page fails if it goes over its time budget or imports a module it should only
+# load on demand (e.g. the OpenAI SDK before any call, or pypdf before any upload).
+# Exits non-zero on any failure, so it can gate CI.
+#
+#   python benchmarks/bench_cold_start.py
+#   python benchmarks/bench_cold_start.py --repeat 5 --budget-scale 2   # slower machines
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ("openai", "httpx2", "requests", "bs4", "docx", "pypdf", "pandas", "numpy", "pyarrow")
+
+# page -> (budget in ms for the first run, heavy modules it may load on first run)
+BUDGETS = {
+    "Home.py": (400, ()),
+    "pages/1_Data_insights.py": (1500, ("pandas", "numpy", "pyarrow")),
+    "pages/2_Interview_question_generator.py": (400, ()),
+    "pages/3_Job_advert_optimiser.py": (600, ()),
+    "pages/4_Developer_documents.py": (400, ()),
+    "pages/5_Performance.py": (1000, ("pandas", "numpy", "pyarrow")),
+}
+
+# run in the child: time one authenticated AppTest run and report new heavy modules
+CHILD = """
+import json, os, sys, time
+import streamlit
+from streamlit.testing.v1 import AppTest
+before = set(sys.modules)
+start = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=60)
+at.session_state["authenticated"] = True
+at.session_state["admin"] = True  # the Performance page needs both
+at.run()
+elapsed = time.perf_counter() - start
+loaded = sorted({m.split(".")[0] for m in set(sys.modules) - before} & set(sys.argv[2].split(",")))
+print(json.dumps({"ms": elapsed * 1000, "loaded": loaded, "errors": [str(e.value) for e in at.exception]}))
+"""
+
+
+def measure(page: str) -> dict:
+    env = {
+        **os.environ,
+        "PYTHONPATH": ROOT,
+        "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "bench"),
+        # keep the benchmark off the real caches and data
+        "CACHE_DIR": os.getenv("BENCH_CACHE_DIR", os.path.join(ROOT, ".cache", "bench")),
+        "JOBS_SOURCE": "mock",
+    }
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD, os.path.join(ROOT, page), ",".join(HEAVY_MODULES)],
+        capture_output=True, text=True, cwd=ROOT, env=env, check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold-start budget check for every page.")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per page; the median is used")
+    parser.add_argument("--budget-scale", type=float, default=float(os.getenv("COLD_START_BUDGET_SCALE", "1")))
+    parser.add_argument("pages", nargs="*", default=list(BUDGETS))
+    args = parser.parse_args(argv)
+
+    failures = 0
+    print(f"{'page':<42} {'median (ms)':>12} {'budget (ms)':>12}  heavy imports")
+    for page in args.pages:
+        budget, allowed = BUDGETS[page]
+        budget *= args.budget_scale
+        runs = [measure(page) for _ in range(args.repeat)]
+        median = statistics.median(run["ms"] for run in runs)
+        loaded = sorted({m for run in runs for m in run["loaded"]})
+        problems = [f"error: {e}" for run in runs for e in run["errors"]][:1]
+        if median > budget:
+            problems.append("over budget")
+        unexpected = [m for m in loaded if m not in allowed]
+        if unexpected:
+            problems.append("should be lazy: " + ", ".join(unexpected))
+        failures += bool(problems)
+        status = "  FAIL " + "; ".join(problems) if problems else ""
+        print(f"{page:<42} {median:>12.0f} {budget:>12.0f}  {', '.join(loaded) or '-'}{status}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,350 @@
+# benchmarks/bench_e2e.py
+# Offline end-to-end benchmark of the advert and interview code paths. It starts the
+# mock OpenAI API and a static server for the HTML adverts (mock_servers.py),
+# renders the advert corpus (corpus.py), points the app at them through
+# OPENAI_BASE_URL, and runs scripted scenarios through the same functions the
+# pages use:
+#   upload-*            extract_text_from_bytes (what the upload box calls), per format
+#   url                 fetch_html + html_to_text (what "Extract from URL" calls)
+#   structure[-long]    structure_advert (chunked and merged for the long advert)
+#   extract-optimise    extract_and_optimise, the combined single-call path
+#   optimise-field      optimise_single_field
+#   optimise-stream     stream_optimisation, read to the end
+#   optimise-fields     optimise_fields, all content fields concurrently
+#   interview[-stream]  request_questions / stream_questions
+#   interview-variants  generate_variants
+# Each scenario runs --iterations times with --concurrency callers and reports
+# p50 / p95 latency, throughput and (for streams) time to first chunk. Results are
+# written to a JSON file; pass an earlier one as --baseline to see the change.
+#
+# Every iteration uses a distinct input, so the upload, HTTP and LLM caches miss
+# and the full path is measured. --warm repeats one input to measure cache hits
+# instead. The app's OpenAI rate limits are off unless --rate-limits is given.
+#
+#   python benchmarks/bench_e2e.py
+#   python benchmarks/bench_e2e.py --scenarios url structure --iterations 50 --concurrency 8
+#   python benchmarks/bench_e2e.py --latency 0.5 --error-rate 0.1 --baseline .cache/bench/results/e2e-base.json
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from corpus import ADVERTS, FORMATS, build_corpus, render  # noqa: E402
+from mock_servers import MockSettings, serve_openai, serve_static  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, ".cache", "bench", "results")
+SHORT_ADVERTS = [name for name in ADVERTS if not name.endswith("-long")]
+INTERVIEW_ANSWERS = {
+    "role_title": "Data Analyst",
+    "grade_level": "HEO",
+    "core_capabilities": "SQL, communicating findings, quality assurance",
+    "experience_focus": "technical",
+    "role_context": "school funding analysis team",
+}
+
+
+# --------------------------
+# SCENARIOS
+# --------------------------
+# name -> (prepare(n, ctx) -> n inputs, run(input) -> seconds to first chunk or None)
+# prepare runs before the clock starts; ctx has the scenario name, --warm and the
+# static server's base URL.
+def _tag(i: int, ctx: dict) -> str:
+    # distinct per scenario and iteration, so nothing is served from a cache
+    return "" if ctx["warm"] else f"BENCH-{ctx['scenario']}-{i}"
+
+
+def _advert(i: int, ctx: dict, name: str = None) -> str:
+    name = name or SHORT_ADVERTS[i % len(SHORT_ADVERTS)]
+    tag = _tag(i, ctx)
+    return ADVERTS[name] + (f"\nReference: {tag}\n" if tag else "")
+
+
+def upload_scenario(fmt: str):
+    from advert_pipeline import extract_text_from_bytes
+
+    def prepare(n, ctx):
+        return [(f"advert.{fmt}", render(fmt, _advert(i, ctx))) for i in range(n)]
+
+    def run(item):
+        if not extract_text_from_bytes(*item):
+            raise RuntimeError("no text extracted")
+    return prepare, run
+
+
+def url_scenario():
+    from advert_pipeline import html_to_text
+    from url_fetch import fetch_html
+
+    def prepare(n, ctx):
+        # a query string per iteration defeats the HTTP cache; --warm revalidates one URL
+        return [f"{ctx['static_url']}/{SHORT_ADVERTS[i % len(SHORT_ADVERTS)]}.html"
+                + (f"?ref={_tag(i, ctx)}" if _tag(i, ctx) else "") for i in range(n)]
+
+    def run(url):
+        if not html_to_text(fetch_html(url)["html"]):
+            raise RuntimeError("no text extracted")
+    return prepare, run
+
+
+def structure_scenario(long: bool = False):
+    from advert_pipeline import TARGET_SCHEMA, structure_advert
+
+    def prepare(n, ctx):
+        return [_advert(i, ctx, "programme-manager-long" if long else None) for i in range(n)]
+
+    def run(text):
+        if not structure_advert(text, TARGET_SCHEMA).get("job_title"):
+            raise RuntimeError("no fields extracted")
+    return prepare, run
+
+
+def extract_optimise_scenario():
+    from advert_pipeline import TARGET_SCHEMA, extract_and_optimise
+
+    def prepare(n, ctx):
+        return [_advert(i, ctx) for i in range(n)]
+
+    def run(text):
+        _, optimised = extract_and_optimise(text, TARGET_SCHEMA)
+        if not optimised:
+            raise RuntimeError("no suggestions")
+    return prepare, run
+
+
+def _summary(i: int, ctx: dict) -> str:
+    text = ADVERTS[SHORT_ADVERTS[i % len(SHORT_ADVERTS)]]
+    return (_tag(i, ctx) + " " + text.split("Summary\n", 1)[1].split("\n\n", 1)[0]).strip()
+
+
+def optimise_field_scenario():
+    from advert_pipeline import optimise_single_field
+
+    def prepare(n, ctx):
+        return [_summary(i, ctx) for i in range(n)]
+
+    def run(text):
+        if optimise_single_field("summary", text) == text:
+            raise RuntimeError("field came back unchanged")
+    return prepare, run
+
+
+def optimise_stream_scenario():
+    from advert_pipeline import stream_optimisation
+
+    def prepare(n, ctx):
+        return [_summary(i, ctx) for i in range(n)]
+
+    def run(text):
+        return _first_chunk(stream_optimisation("summary", text))
+    return prepare, run
+
+
+def optimise_fields_scenario():
+    from advert_pipeline import CONTENT_FIELDS, optimise_fields
+
+    def prepare(n, ctx):
+        return [{field: f"{_summary(i, ctx)} ({field})" for field in CONTENT_FIELDS} for i in range(n)]
+
+    def run(fields):
+        _, failed = optimise_fields(fields)
+        if failed:
+            raise RuntimeError(f"{len(failed)} fields failed")
+    return prepare, run
+
+
+def _answers(i: int, ctx: dict) -> dict:
+    return {**INTERVIEW_ANSWERS, "role_context": f"{INTERVIEW_ANSWERS['role_context']} {_tag(i, ctx)}".strip()}
+
+
+def interview_scenario(stream: bool = False, variants: bool = False):
+    from interview_questions import INTERVIEW_VARIANTS, generate_variants, request_questions, stream_questions
+
+    def prepare(n, ctx):
+        return [_answers(i, ctx) for i in range(n)]
+
+    def run(answers):
+        if variants:
+            _, failed = generate_variants(answers, max(2, INTERVIEW_VARIANTS))
+            if failed:
+                raise RuntimeError(f"{len(failed)} sets failed")
+        elif stream:
+            return _first_chunk(stream_questions(answers))
+        elif not request_questions(answers):
+            raise RuntimeError("no questions")
+    return prepare, run
+
+
+def _first_chunk(chunks):
+    started, first = time.perf_counter(), None
+    for _ in chunks:
+        if first is None:
+            first = time.perf_counter() - started
+    if first is None:
+        raise RuntimeError("empty stream")
+    return first
+
+
+SCENARIOS = {
+    **{f"upload-{fmt}": (lambda fmt=fmt: upload_scenario(fmt)) for fmt in FORMATS},
+    "url": url_scenario,
+    "structure": structure_scenario,
+    "structure-long": lambda: structure_scenario(long=True),
+    "extract-optimise": extract_optimise_scenario,
+    "optimise-field": optimise_field_scenario,
+    "optimise-stream": optimise_stream_scenario,
+    "optimise-fields": optimise_fields_scenario,
+    "interview": interview_scenario,
+    "interview-stream": lambda: interview_scenario(stream=True),
+    "interview-variants": lambda: interview_scenario(variants=True),
+}
+
+
+# --------------------------
+# RUNNING AND REPORTING
+# --------------------------
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    pos = (len(values) - 1) * q
+    lower = int(pos)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (pos - lower)
+
+
+def run_scenario(name: str, iterations: int, concurrency: int, ctx: dict) -> dict:
+    prepare, run = SCENARIOS[name]()
+    inputs = prepare(iterations + 1, {**ctx, "scenario": name})
+    run(inputs.pop())  # warm-up: imports, connection pools, first-use setup
+
+    def timed(item):
+        started = time.perf_counter()
+        try:
+            first = run(item)
+        except Exception as e:
+            return time.perf_counter() - started, None, f"{type(e).__name__}: {e}"
+        return time.perf_counter() - started, first, None
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(timed, inputs))
+    wall = time.perf_counter() - started
+
+    latencies = [seconds for seconds, _, error in outcomes if error is None]
+    firsts = [first for _, first, error in outcomes if error is None and first is not None]
+    errors = [error for _, _, error in outcomes if error is not None]
+    return {
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "mean_ms": sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+        "max_ms": max(latencies) * 1000 if latencies else 0.0,
+        "first_chunk_p50_ms": percentile(firsts, 0.5) * 1000 if firsts else None,
+        "throughput_per_s": len(latencies) / wall if wall else 0.0,
+    }
+
+
+def _change(now: float, before: float) -> str:
+    if not before:
+        return ""
+    return f" ({(now - before) / before:+.0%})"
+
+
+def report(results: dict, baseline: dict = None):
+    before = (baseline or {}).get("scenarios", {})
+    print(f"{'scenario':<20} {'p50 (ms)':>16} {'p95 (ms)':>16} {'ops/s':>14} {'1st chunk':>10} {'errors':>7}")
+    for name, row in results.items():
+        old = before.get(name, {})
+        first = f"{row['first_chunk_p50_ms']:.0f}" if row["first_chunk_p50_ms"] is not None else "-"
+        print(
+            f"{name:<20} "
+            f"{row['p50_ms']:>8.1f}{_change(row['p50_ms'], old.get('p50_ms')):>8} "
+            f"{row['p95_ms']:>8.1f}{_change(row['p95_ms'], old.get('p95_ms')):>8} "
+            f"{row['throughput_per_s']:>7.1f}{_change(row['throughput_per_s'], old.get('throughput_per_s')):>7} "
+            f"{first:>10} {row['errors']:>7}"
+        )
+        if row["first_error"]:
+            print(f"{'':<20} first error: {row['first_error']}")
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark against local mock servers.")
+    parser.add_argument("--scenarios", nargs="*", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.2, help="mock OpenAI seconds to first byte")
+    parser.add_argument("--token-delay", type=float, default=0.005, help="mock OpenAI seconds per streamed chunk")
+    parser.add_argument("--output-tokens", type=int, default=150, help="size of mock free-text answers")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of mock OpenAI requests answered 429")
+    parser.add_argument("--warm", action="store_true", help="repeat one input per scenario, to measure cache hits")
+    parser.add_argument("--rate-limits", action="store_true", help="keep the app's OPENAI_RPM / OPENAI_TPM limits")
+    parser.add_argument("--out", help="results file (default: .cache/bench/results/e2e-<time>.json)")
+    parser.add_argument("--baseline", help="an earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="bench-e2e-")
+    corpus_dir = os.path.join(workdir, "corpus")
+    build_corpus(corpus_dir)
+    settings = MockSettings(args.latency, args.token_delay, args.output_tokens, args.error_rate)
+    openai_server = serve_openai(0, settings)
+    static_server = serve_static(corpus_dir)
+
+    # the app reads these at import, so set them before any scenario imports it
+    os.environ.update({
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{openai_server.server_port}/v1",
+        "OPENAI_API_KEY": "bench",
+        "CACHE_DIR": os.path.join(workdir, "cache"),  # fresh caches every run
+        "STATE_BACKEND": "none",
+    })
+    if not args.rate_limits:
+        os.environ.update({"OPENAI_RPM": "0", "OPENAI_TPM": "0"})
+
+    ctx = {"warm": args.warm, "static_url": f"http://127.0.0.1:{static_server.server_port}"}
+    results = {}
+    for name in args.scenarios:
+        results[name] = run_scenario(name, args.iterations, args.concurrency, ctx)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    report(results, baseline)
+
+    out = args.out or os.path.join(RESULTS_DIR, time.strftime("e2e-%Y%m%d-%H%M%S.json"))
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump({
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "settings": {k: v for k, v in vars(args).items() if k not in ("out", "baseline")},
+            "mock_openai": {"requests": settings.requests, "rate_limited": settings.rate_limited},
+            "scenarios": results,
+        }, f, indent=2)
+    print(f"\nresults written to {out}")
+    return 1 if any(row["errors"] for row in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
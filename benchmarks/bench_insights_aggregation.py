@@ -0,0 +1,95 @@
+# benchmarks/bench_insights_aggregation.py
+# Compares the Data insights page's original per-metric boolean scans with the
+# single-pass summarise_jobs() at 10k / 1M / 10M rows. "metrics" is the scorecard
+# numbers plus (for the new path) every status's row positions; "+ tables" also
+# materialises the three full per-status tables, whose copying cost is the same
+# either way.
+#
+#   python benchmarks/bench_insights_aggregation.py
+#   python benchmarks/bench_insights_aggregation.py --sizes 10000 1000000
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from insights_data import STATUSES, STATUS_DTYPE, status_table, summarise_jobs  # noqa: E402
+
+
+def make_jobs(rows: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    codes = rng.choice(len(STATUSES), size=rows, p=[0.1, 0.3, 0.6])
+    return pd.DataFrame({
+        "job_id": np.arange(rows),
+        "job_title": pd.Categorical.from_codes(rng.integers(0, 16, size=rows), [f"Title {i}" for i in range(16)]),
+        "status": pd.Categorical.from_codes(codes, dtype=STATUS_DTYPE),
+        "views": rng.integers(0, 2000, size=rows),
+    })
+
+
+def original_metrics(df: pd.DataFrame):
+    # what pages/1_Data_insights.py did before summarise_jobs()
+    draft = (df["status"] == "Draft").sum()
+    advertised = (df["status"] == "Advertised").sum()
+    closed = (df["status"] == "Closed").sum()
+    views = df[df["status"].isin(["Advertised", "Closed"])]["views"].sum()
+    return draft, advertised, closed, views
+
+
+def original(df: pd.DataFrame):
+    tables = (
+        df[df["status"] == "Draft"][["job_id", "job_title"]],
+        df[df["status"] == "Advertised"][["job_id", "job_title", "views"]],
+        df[df["status"] == "Closed"][["job_id", "job_title", "views"]],
+    )
+    return original_metrics(df), tables
+
+
+def single_pass(df: pd.DataFrame):
+    summary = summarise_jobs(df)
+    tables = (
+        status_table(df, summary, "Draft", ["job_id", "job_title"]),
+        status_table(df, summary, "Advertised", ["job_id", "job_title", "views"]),
+        status_table(df, summary, "Closed", ["job_id", "job_title", "views"]),
+    )
+    return summary, tables
+
+
+def best_of(fn, df, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(df)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-metric scans vs single-pass aggregation for Data insights.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{'rows':>12} {'':>10} {'original (s)':>14} {'single pass (s)':>16} {'speed-up':>9}")
+    for rows in args.sizes:
+        df = make_jobs(rows)
+        summary, _ = single_pass(df)
+        assert original_metrics(df) == (
+            summary["counts"]["Draft"], summary["counts"]["Advertised"],
+            summary["counts"]["Closed"], summary["published_views"],
+        )
+        for label, before_fn, after_fn in (
+            ("metrics", original_metrics, summarise_jobs),
+            ("+ tables", original, single_pass),
+        ):
+            before = best_of(before_fn, df, args.repeat)
+            after = best_of(after_fn, df, args.repeat)
+            print(f"{rows:>12,} {label:>10} {before:>14.4f} {after:>16.4f} {before / after:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
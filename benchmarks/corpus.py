@@ -0,0 +1,229 @@
+# benchmarks/corpus.py
+# A small corpus of job adverts for the offline benchmarks, rendered as TXT, DOCX,
+# PDF and HTML from the texts below, so nothing binary has to live in the repo.
+# "long" adverts are past STRUCTURER_CHUNK_TOKENS, so they take the chunked
+# extraction path. DOCX needs python-docx; PDFs are written by hand (one Helvetica
+# text stream per page), so they need nothing extra.
+#
+#   python benchmarks/corpus.py --out .cache/bench/corpus
+import argparse
+import os
+import sys
+from io import BytesIO
+
+ADVERTS = {
+    "data-analyst": """Data Analyst
+Department: Department for Education
+Location: Sheffield, Manchester or London (hybrid)
+Salary: £38,000 - £42,500
+Grade: Higher Executive Officer (HEO)
+Closing date: 14 November 2026
+
+Summary
+We are looking for a Data Analyst to join our school funding analysis team. You will turn
+large administrative datasets into clear evidence that shapes how billions of pounds reach schools.
+
+Responsibilities
+- Build and maintain reproducible analysis pipelines in SQL and Python or R.
+- Produce statistics and briefings for ministers and senior officials.
+- Quality assure the work of colleagues and explain your methods to non-specialists.
+- Work with policy teams to understand the questions behind each request.
+- Contribute to improving the team's data tools and documentation.
+
+Essential criteria
+- Experience analysing large datasets with SQL and a programming language such as Python or R.
+- Ability to communicate complex findings clearly in writing and in person.
+- Good judgement about data quality and the limits of an analysis.
+
+Desirable criteria
+- Experience of official statistics or the Code of Practice for Statistics.
+- Familiarity with version control (Git) and reproducible analytical pipelines.
+""",
+    "policy-advisor": """Senior Policy Advisor, Net Zero Buildings
+Department: Department for Energy Security and Net Zero
+Location: London or Birmingham
+Salary: £52,000 - £58,000
+Grade: Grade 7
+Closing date: 2 December 2026
+
+Summary
+Lead the development of policy to decarbonise heat in homes. You will own a complex area of
+policy from evidence gathering through to implementation, working closely with analysts,
+lawyers and delivery partners.
+
+Responsibilities
+- Develop policy options and advise ministers on trade-offs.
+- Manage stakeholder relationships across industry, consumer groups and local government.
+- Lead a small team of policy officers and support their development.
+- Commission and interpret analysis and research.
+- Prepare legislation and parliamentary business, including responses to select committees.
+
+Essential criteria
+- Experience of developing policy or strategy in a complex environment.
+- Strong written and verbal communication skills, including drafting for senior audiences.
+- Ability to lead and develop a team.
+
+Desirable criteria
+- Knowledge of energy, housing or climate policy.
+""",
+    "service-desk": """Service Desk Analyst
+Department: HM Revenue and Customs
+Location: Newcastle
+Salary: £27,500
+Grade: Executive Officer (EO)
+Closing date: 21 October 2026
+
+Summary
+Join our IT service desk supporting 60,000 colleagues. You will resolve technical issues first
+time wherever possible and make sure everything else reaches the right team quickly.
+
+Responsibilities
+- Respond to calls, chats and tickets from colleagues across the UK.
+- Diagnose and resolve hardware, software and account issues.
+- Record incidents accurately and escalate where needed.
+- Share knowledge by writing and improving help articles.
+
+Essential criteria
+- Customer service experience, ideally in a technical support role.
+- Patient, clear communication with people of all technical abilities.
+
+Desirable criteria
+- ITIL Foundation or similar.
+""",
+}
+
+# the long advert repeats extra responsibilities until it is well past one extraction chunk
+LONG_SECTION = (
+    "- Lead workstream {n}: coordinate analysts, policy leads and delivery partners, track risks and "
+    "dependencies, prepare fortnightly updates for the programme board and make sure decisions are "
+    "recorded, communicated and acted on across the directorate.\n"
+)
+ADVERTS["programme-manager-long"] = ADVERTS["policy-advisor"].replace(
+    "Senior Policy Advisor, Net Zero Buildings", "Programme Manager, Net Zero Buildings"
+).replace(
+    "Essential criteria", "".join(LONG_SECTION.format(n=n) for n in range(1, 80)) + "\nEssential criteria"
+)
+
+FORMATS = ("txt", "docx", "pdf", "html")
+
+HTML_PAGE = """<!doctype html>
+<html lang="en"><head><meta charset="utf-8"><title>{title} - Civil Service Jobs</title>
+<script>window.dataLayer = window.dataLayer || []; function gtag(){{dataLayer.push(arguments);}}</script>
+<style>body {{ font-family: sans-serif; }} nav a {{ margin-right: 1em; }}</style></head>
+<body>
+<header><nav><a href="/">Home</a><a href="/search">Search jobs</a><a href="/account">Your account</a></nav></header>
+<main><article>
+{body}
+</article></main>
+<footer><p>Cookies</p><p>Accessibility statement</p><p>Crown copyright</p></footer>
+</body></html>
+"""
+
+
+def render(fmt: str, text: str) -> bytes:
+    """The advert `text` as a file of the given format."""
+    if fmt == "txt":
+        return text.encode("utf-8")
+    if fmt == "html":
+        return _html(text).encode("utf-8")
+    if fmt == "docx":
+        return _docx(text)
+    if fmt == "pdf":
+        return _pdf(text)
+    raise ValueError(f"unknown format: {fmt}")
+
+
+def _html(text: str) -> str:
+    from html import escape
+
+    lines = text.strip().splitlines()
+    parts, bullets = [f"<h1>{escape(lines[0])}</h1>"], []
+    for line in lines[1:] + [""]:
+        if line.startswith("- "):
+            bullets.append(f"<li>{escape(line[2:])}</li>")
+            continue
+        if bullets:
+            parts.append("<ul>" + "".join(bullets) + "</ul>")
+            bullets = []
+        if line.strip():
+            parts.append(f"<p>{escape(line)}</p>")
+    return HTML_PAGE.format(title=escape(lines[0]), body="\n".join(parts))
+
+
+def _docx(text: str) -> bytes:
+    import docx
+
+    document = docx.Document()
+    for line in text.splitlines():
+        document.add_paragraph(line)
+    out = BytesIO()
+    document.save(out)
+    return out.getvalue()
+
+
+def _pdf(text: str, width: int = 90, lines_per_page: int = 50) -> bytes:
+    lines = []
+    for line in text.encode("latin-1", errors="replace").decode("latin-1").splitlines():
+        while len(line) > width:
+            cut = line.rfind(" ", 0, width)
+            cut = cut if cut > 0 else width
+            lines.append(line[:cut])
+            line = line[cut:].lstrip()
+        lines.append(line)
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+
+    def escape(line):
+        return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    # 1 catalog, 2 page tree, 3 font, then a page and its content stream per page
+    kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(len(pages)))
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    for i, page in enumerate(pages):
+        content = ("BT /F1 10 Tf 50 800 Td 14 TL " + " ".join(f"({escape(line)}) '" for line in page) + " ET")
+        content = content.encode("latin-1")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+
+    out, offsets = bytearray(b"%PDF-1.4\n"), []
+    for n, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % n + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def build_corpus(directory: str) -> list:
+    """Write every advert in every format to `directory`; returns the file paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for name, text in ADVERTS.items():
+        for fmt in FORMATS:
+            path = os.path.join(directory, f"{name}.{fmt}")
+            with open(path, "wb") as f:
+                f.write(render(fmt, text))
+            paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write the benchmark advert corpus.")
+    parser.add_argument("--out", default=os.path.join(".cache", "bench", "corpus"))
+    args = parser.parse_args(argv)
+    for path in build_corpus(args.out):
+        print(f"{os.path.getsize(path):>8}  {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,283 @@
+# benchmarks/mock_servers.py
+# Local stand-ins for the two things the app talks to over the network, so its code
+# paths can be benchmarked offline:
+#   - an OpenAI-compatible API (POST /v1/chat/completions and /v1/responses, plain or
+#     streamed as server-sent events) with configurable latency, output size and
+#     injected 429s; point the SDK at it with OPENAI_BASE_URL=http://host:port/v1;
+#   - a static file server for URL fixtures (e.g. the HTML adverts from corpus.py),
+#     with Last-Modified / If-Modified-Since like a real site.
+# Answers are canned but shaped like the real ones: JSON objects with the schema keys
+# the prompt asks for, rewritten text, or grouped interview questions. Usage is
+# reported in tokens (about four characters each).
+#
+# Both can also be run on their own, e.g. to try the app against them:
+#   python benchmarks/mock_servers.py openai --port 8765 --latency 0.3
+#   python benchmarks/mock_servers.py static --port 8766 --dir .cache/bench/corpus
+import argparse
+import functools
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+CHARS_PER_TOKEN = 4
+CHUNK_TOKENS = 4  # tokens per streamed delta
+
+SCHEMA_KEY = re.compile(r'"(\w+)": ""')
+CONTENT_KEYS = re.compile(r"with the keys (\[[^\]]*\])")
+INTERVIEW_QUESTIONS = """Core
+1. What draws you to this role, and what would you focus on in your first three months?
+2. Which parts of your experience best prepare you for the main responsibilities?
+Behavioural
+3. Tell me about a time you had to explain something complex to a non-specialist audience.
+4. Describe a situation where priorities changed at short notice. What did you do?
+5. Give an example of when you improved the way your team worked.
+Scenario
+6. A senior stakeholder disagrees with your recommendation the day before a deadline. How do you respond?
+7. You find an error in work that has already been shared. What are your next steps?"""
+
+
+def _filler(tokens: int) -> str:
+    words = ("clear", "evidence", "delivery", "stakeholders", "improve", "team", "public", "service")
+    return " ".join(words[i % len(words)] for i in range(tokens))
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+class MockSettings:
+    """How the mock OpenAI server behaves; shared by its request threads."""
+
+    def __init__(self, latency: float = 0.2, token_delay: float = 0.005, output_tokens: int = 150,
+                 error_rate: float = 0.0, retry_after: float = 0.1, seed: int = 7):
+        self.latency = latency  # seconds before the first byte of an answer
+        self.token_delay = token_delay  # seconds per generated chunk (CHUNK_TOKENS tokens)
+        self.output_tokens = output_tokens  # size of free-text answers
+        self.error_rate = error_rate  # share of requests answered 429
+        self.retry_after = retry_after  # seconds, sent in Retry-After with those 429s
+        self.requests = 0
+        self.rate_limited = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def admit(self) -> bool:
+        """Count a request; False if it should be rejected with a 429."""
+        with self._lock:
+            self.requests += 1
+            if self._random.random() < self.error_rate:
+                self.rate_limited += 1
+                return False
+            return True
+
+
+def answer_chat(body: dict, settings: MockSettings) -> str:
+    prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+    wants_json = (body.get("response_format") or {}).get("type") == "json_object" or "valid JSON" in prompt
+    if not wants_json:
+        # a rewrite: the text after "Text:", as bullets, padded to the configured size
+        source = prompt.split("Text:", 1)[-1]
+        lines = [line.strip("-• ").strip() for line in source.splitlines() if line.strip()]
+        text = "\n".join(f"- {line}" for line in lines[:8])
+        return (text + "\n" + _filler(settings.output_tokens))[: settings.output_tokens * CHARS_PER_TOKEN]
+
+    fields = {key: f"Mock {key.replace('_', ' ')}" for key in SCHEMA_KEY.findall(prompt)}
+    content = CONTENT_KEYS.search(prompt)
+    if content:
+        # the combined extract + optimise prompt
+        keys = json.loads(content.group(1))
+        fields = {key: value for key, value in fields.items() if key not in keys}
+        optimised = {key: f"Improved {key.replace('_', ' ')}: " + _filler(settings.output_tokens // 4)
+                     for key in keys}
+        return json.dumps({"fields": fields, "optimised": optimised})
+    return json.dumps(fields)
+
+
+def answer_responses(body: dict, settings: MockSettings) -> str:
+    return INTERVIEW_QUESTIONS
+
+
+def _chunks(text: str) -> list:
+    size = CHUNK_TOKENS * CHARS_PER_TOKEN
+    return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    settings = None  # set per server
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        path = self.path.split("?")[0].rstrip("/")
+
+        if path.endswith("/chat/completions"):
+            answer, kind = answer_chat(body, self.settings), "chat"
+            prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        elif path.endswith("/responses"):
+            answer, kind = answer_responses(body, self.settings), "responses"
+            prompt = str(body.get("instructions") or "") + str(body.get("input") or "")
+        else:
+            self._json(404, {"error": {"message": f"no mock for {self.path}", "type": "invalid_request_error"}})
+            return
+
+        time.sleep(self.settings.latency)
+        if not self.settings.admit():
+            self._json(429, {"error": {"message": "Rate limit reached (mock)", "type": "rate_limit_error",
+                                       "code": "rate_limit_exceeded"}},
+                       headers={"retry-after": str(self.settings.retry_after)})
+            return
+
+        usage = (_tokens(prompt), _tokens(answer))
+        model = body.get("model", "mock")
+        if body.get("stream"):
+            include_usage = (body.get("stream_options") or {}).get("include_usage")
+            stream = self._chat_events if kind == "chat" else self._responses_events
+            self._sse(stream(model, answer, usage, include_usage))
+        else:
+            time.sleep(self.settings.token_delay * len(_chunks(answer)))
+            build = _chat_completion if kind == "chat" else _response
+            self._json(200, build(model, answer, usage))
+
+    # ---- writing ----
+    def _json(self, status: int, payload: dict, headers: dict = None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _sse(self, events):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for event in events:
+            if event is not None:
+                data = event.encode("utf-8")
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _chat_events(self, model, answer, usage, include_usage):
+        base = {"id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": model}
+        for i, piece in enumerate(_chunks(answer)):
+            if i:
+                time.sleep(self.settings.token_delay)
+            delta = {"role": "assistant", "content": piece} if i == 0 else {"content": piece}
+            yield "data: " + json.dumps({**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}) + "\n\n"
+        yield "data: " + json.dumps({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}) + "\n\n"
+        if include_usage:
+            yield "data: " + json.dumps({**base, "choices": [], "usage": _chat_usage(usage)}) + "\n\n"
+        yield "data: [DONE]\n\n"
+
+    def _responses_events(self, model, answer, usage, include_usage):
+        response = _response(model, answer, usage)
+        seq = iter(range(10 ** 6))
+
+        def event(kind, **fields):
+            return f"event: {kind}\ndata: " + json.dumps({"type": kind, "sequence_number": next(seq), **fields}) + "\n\n"
+
+        yield event("response.created", response={**response, "status": "in_progress", "output": [], "usage": None})
+        for i, piece in enumerate(_chunks(answer)):
+            if i:
+                time.sleep(self.settings.token_delay)
+            yield event("response.output_text.delta", item_id=response["output"][0]["id"], output_index=0,
+                        content_index=0, delta=piece, logprobs=[])
+        yield event("response.completed", response=response)
+
+
+def _chat_usage(usage: tuple) -> dict:
+    return {"prompt_tokens": usage[0], "completion_tokens": usage[1], "total_tokens": sum(usage),
+            "prompt_tokens_details": {"cached_tokens": 0}}
+
+
+def _chat_completion(model: str, answer: str, usage: tuple) -> dict:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "object": "chat.completion", "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+        "usage": _chat_usage(usage),
+    }
+
+
+def _response(model: str, answer: str, usage: tuple) -> dict:
+    return {
+        "id": f"resp_{uuid.uuid4().hex[:12]}", "object": "response", "created_at": int(time.time()),
+        "model": model, "status": "completed", "parallel_tool_calls": False, "tool_choice": "auto", "tools": [],
+        "output": [{
+            "type": "message", "id": f"msg_{uuid.uuid4().hex[:12]}", "status": "completed", "role": "assistant",
+            "content": [{"type": "output_text", "text": answer, "annotations": []}],
+        }],
+        "usage": {"input_tokens": usage[0], "input_tokens_details": {"cached_tokens": 0},
+                  "output_tokens": usage[1], "output_tokens_details": {"reasoning_tokens": 0},
+                  "total_tokens": sum(usage)},
+    }
+
+
+class QuietStaticHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def _start(server) -> ThreadingHTTPServer:
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name=type(server).__name__, daemon=True).start()
+    return server
+
+
+def serve_openai(port: int = 0, settings: MockSettings = None, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Start the mock OpenAI API in a background thread; server.server_port has the port."""
+    handler = type("Handler", (MockOpenAIHandler,), {"settings": settings or MockSettings()})
+    server = _start(ThreadingHTTPServer((host, port), handler))
+    server.settings = handler.settings
+    return server
+
+
+def serve_static(directory: str, port: int = 0, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve `directory` over HTTP in a background thread."""
+    handler = functools.partial(QuietStaticHandler, directory=directory)
+    return _start(ThreadingHTTPServer((host, port), handler))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a mock OpenAI API or a static fixture server.")
+    sub = parser.add_subparsers(dest="server", required=True)
+    openai = sub.add_parser("openai")
+    openai.add_argument("--port", type=int, default=8765)
+    openai.add_argument("--latency", type=float, default=0.2, help="seconds before the first byte")
+    openai.add_argument("--token-delay", type=float, default=0.005, help=f"seconds per {CHUNK_TOKENS} tokens")
+    openai.add_argument("--output-tokens", type=int, default=150)
+    openai.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered 429")
+    static = sub.add_parser("static")
+    static.add_argument("--port", type=int, default=8766)
+    static.add_argument("--dir", default=".")
+    args = parser.parse_args(argv)
+
+    if args.server == "openai":
+        settings = MockSettings(args.latency, args.token_delay, args.output_tokens, args.error_rate)
+        server = serve_openai(args.port, settings)
+        print(f"mock OpenAI API on http://127.0.0.1:{server.server_port}/v1")
+    else:
+        server = serve_static(args.dir, args.port)
+        print(f"serving {args.dir} on http://127.0.0.1:{server.server_port}/")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+# cache.py
+# Two-tier (in-memory LRU + SQLite on disk) cache shared by the pages.
+# Module-level instances live for the whole process, so they survive Streamlit reruns,
+# and the SQLite file survives process restarts.
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_DIR = os.getenv("CACHE_DIR", ".cache")
+
+# every cache in the process by name, for reporting hit rates
+CACHES = {}
+
+
+class TieredCache:
+    """Small LRU in front of a SQLite table, with TTL and size-based eviction.
+
+    Values must be JSON-serialisable. The memory tier is bounded by item count and by
+    the encoded size of its values; pass path="" for a memory-only cache. Counters
+    are kept for memory hits, disk hits and misses.
+    """
+
+    def __init__(self, name: str, max_items: int = 256, ttl: float = 7 * 24 * 3600,
+                 max_disk_bytes: int = 50 * 1024 * 1024, path: str = None,
+                 max_memory_bytes: int = None):
+        self.name = name
+        self.max_items = max_items
+        self.max_memory_bytes = max_memory_bytes
+        self.ttl = ttl
+        self.max_disk_bytes = max_disk_bytes
+        self.path = path if path is not None else os.path.join(CACHE_DIR, f"{name}.sqlite3")
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._db = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        CACHES[name] = self
+
+    # ---- disk tier ----
+    def _conn(self):
+        if self._db is None and self.path:
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._db = sqlite3.connect(self.path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS entries ("
+                    "key TEXT PRIMARY KEY, value TEXT, created REAL, accessed REAL, size INTEGER)"
+                )
+                self._db.commit()
+            except sqlite3.Error:
+                # disk tier is best-effort; fall back to memory only
+                self.path = None
+                self._db = None
+        return self._db
+
+    def _evict_disk(self, db):
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        for key, size in db.execute("SELECT key, size FROM entries ORDER BY accessed").fetchall():
+            db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_disk_bytes:
+                break
+
+    # ---- public API ----
+    def get(self, key: str, default=None):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, value, _ = entry
+                if now - created <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return value
+                self._forget(key)
+
+            db = self._conn()
+            if db is not None:
+                try:
+                    row = db.execute("SELECT value, created FROM entries WHERE key = ?", (key,)).fetchone()
+                    if row is not None:
+                        if now - row[1] <= self.ttl:
+                            db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+                            db.commit()
+                            value = json.loads(row[0])
+                            self._remember(key, row[1], value, len(row[0]))
+                            self.disk_hits += 1
+                            return value
+                        db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                        db.commit()
+                except sqlite3.Error:
+                    pass
+
+            self.misses += 1
+            return default
+
+    def set(self, key: str, value):
+        now = time.time()
+        payload = json.dumps(value)
+        with self._lock:
+            self._remember(key, now, value, len(payload))
+            db = self._conn()
+            if db is not None:
+                try:
+                    db.execute(
+                        "INSERT OR REPLACE INTO entries (key, value, created, accessed, size) VALUES (?, ?, ?, ?, ?)",
+                        (key, payload, now, now, len(payload)),
+                    )
+                    self._evict_disk(db)
+                    db.commit()
+                except sqlite3.Error:
+                    pass
+
+    def _remember(self, key, created, value, size):
+        self._forget(key)
+        self._memory[key] = (created, value, size)
+        self._memory_bytes += size
+        while self._memory and (
+            len(self._memory) > self.max_items
+            or (self.max_memory_bytes is not None and self._memory_bytes > self.max_memory_bytes)
+        ):
+            _, (_, _, evicted) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted
+
+    def _forget(self, key):
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= entry[2]
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            db = self._conn()
+            if db is not None:
+                db.execute("DELETE FROM entries")
+                db.commit()
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_items": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+        }
+
+
+def make_key(*parts) -> str:
+    """Content-addressed key: SHA-256 over the JSON encoding of the parts."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def llm_key(model: str, temperature: float, prompt_version: str, text: str) -> str:
+    return make_key("llm", model, temperature, prompt_version, text)
+
+
+# process-wide cache for LLM extraction / optimisation results
+llm_cache = TieredCache(
+    "llm",
+    max_items=int(os.getenv("LLM_CACHE_ITEMS", "512")),
+    ttl=float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600))),
+    max_disk_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", str(50 * 1024 * 1024))),
+)
@@ -0,0 +1,171 @@
+# ingest.py
+# Headless bulk extraction of job adverts to JSONL.
+#
+#   python ingest.py adverts/ -o adverts.jsonl
+#   python ingest.py adverts.zip -o adverts.jsonl --workers 8 --concurrency 16
+#   python ingest.py urls.txt -o adverts.jsonl
+#
+# Documents are parsed in a process pool and LLM extraction runs through a
+# concurrency-limited asyncio pool. Each finished advert is appended to the output
+# as one JSON line ({"source": ..., <TARGET_SCHEMA fields>}) and flushed, so the
+# output doubles as the checkpoint: re-running the same command skips every
+# source already written. Failures go to <output>.errors.jsonl and are retried
+# on the next run.
+import argparse
+import asyncio
+import json
+import os
+import sys
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from advert_pipeline import (
+    SUPPORTED_EXTENSIONS,
+    TARGET_SCHEMA,
+    extract_text_from_bytes,
+    html_to_text,
+    normalise_schema,
+    normalise_url,
+    structure_advert,
+)
+
+
+# --------------------------
+# SOURCES
+# --------------------------
+def iter_sources(source: str):
+    """Yield (source_id, kind, locator) for every advert in a directory, ZIP or URL list."""
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                    path = os.path.join(root, name)
+                    yield os.path.relpath(path, source), "file", path
+    elif zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as zf:
+            for info in zf.infolist():
+                if not info.is_dir() and info.filename.lower().endswith(SUPPORTED_EXTENSIONS):
+                    yield info.filename, "zip", (source, info.filename)
+    else:
+        with open(source, encoding="utf-8") as fh:
+            for line in fh:
+                url = line.strip()
+                if url and not url.startswith("#"):
+                    yield url, "url", normalise_url(url)
+
+
+def parse_file(path: str) -> str:
+    with open(path, "rb") as fh:
+        return extract_text_from_bytes(path, fh.read())
+
+
+def parse_zip_member(locator: tuple) -> str:
+    zip_path, member = locator
+    with zipfile.ZipFile(zip_path) as zf:
+        return extract_text_from_bytes(member, zf.read(member))
+
+
+def fetch_url_text(url: str) -> str:
+    # imported here so process-pool workers don't build an HTTP session they never use
+    from url_fetch import fetch_html
+    return html_to_text(fetch_html(url)["html"])
+
+
+# --------------------------
+# CHECKPOINT
+# --------------------------
+def load_done(output: str) -> set:
+    """Sources already written to the output file."""
+    done = set()
+    if not os.path.exists(output):
+        return done
+    with open(output, encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                done.add(json.loads(line)["source"])
+            except (ValueError, KeyError, TypeError):
+                # a torn last line from a crash; that source will be redone
+                continue
+    return done
+
+
+# --------------------------
+# PIPELINE
+# --------------------------
+async def run(source: str, output: str, workers: int, concurrency: int, limit: int = None) -> dict:
+    loop = asyncio.get_running_loop()
+    done = load_done(output)
+    counts = {"skipped": 0, "written": 0, "failed": 0}
+
+    parse_pool = ProcessPoolExecutor(max_workers=workers)
+    io_pool = ThreadPoolExecutor(max_workers=concurrency)
+    llm_slots = asyncio.Semaphore(concurrency)
+
+    out = open(output, "a", encoding="utf-8")
+    errors = open(output + ".errors.jsonl", "a", encoding="utf-8")
+
+    async def handle(source_id, kind, locator):
+        try:
+            if kind == "file":
+                text = await loop.run_in_executor(parse_pool, parse_file, locator)
+            elif kind == "zip":
+                text = await loop.run_in_executor(parse_pool, parse_zip_member, locator)
+            else:
+                text = await loop.run_in_executor(io_pool, fetch_url_text, locator)
+            if not text.strip():
+                raise ValueError("no text extracted")
+            async with llm_slots:
+                extracted = await loop.run_in_executor(io_pool, structure_advert, text, TARGET_SCHEMA)
+        except Exception as e:
+            errors.write(json.dumps({"source": source_id, "error": f"{type(e).__name__}: {e}"}) + "\n")
+            errors.flush()
+            counts["failed"] += 1
+            return
+        out.write(json.dumps({"source": source_id, **normalise_schema(extracted)}) + "\n")
+        out.flush()
+        counts["written"] += 1
+
+    # keep a bounded number of adverts in flight so huge inputs aren't held in memory
+    max_in_flight = max(workers, concurrency) * 2
+    pending = set()
+    try:
+        for n, (source_id, kind, locator) in enumerate(iter_sources(source)):
+            if limit is not None and n >= limit:
+                break
+            if source_id in done:
+                counts["skipped"] += 1
+                continue
+            pending.add(asyncio.ensure_future(handle(source_id, kind, locator)))
+            if len(pending) >= max_in_flight:
+                _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        if pending:
+            await asyncio.wait(pending)
+    finally:
+        out.close()
+        errors.close()
+        parse_pool.shutdown()
+        io_pool.shutdown()
+
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract structured job adverts in bulk to JSONL.")
+    parser.add_argument("source", help="directory of adverts, a .zip of adverts, or a text file of URLs (one per line)")
+    parser.add_argument("-o", "--output", required=True, help="JSONL file to append results to (also the resume checkpoint)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="document parsing processes")
+    parser.add_argument("--concurrency", type=int, default=8, help="LLM calls in flight at once")
+    parser.add_argument("--limit", type=int, default=None, help="only look at the first N sources")
+    args = parser.parse_args(argv)
+
+    if not os.getenv("OPENAI_API_KEY"):
+        print("OPENAI_API_KEY not found in environment — OpenAI calls will fail until you set it.", file=sys.stderr)
+
+    counts = asyncio.run(run(args.source, args.output, args.workers, args.concurrency, args.limit))
+    print(f"written={counts['written']} skipped={counts['skipped']} failed={counts['failed']}", file=sys.stderr)
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,472 @@
+# insights_data.py
+# Where the Data insights page gets its jobs from. The page only talks to a JobsSource:
+#   - MockJobsSource: the handful of example rows the page started with
+#   - SQLiteJobsSource: a local stand-in for GRID, built with `python insights_data.py build-fixture`
+#   - ApiJobsSource: a paginated jobs API (e.g. the future Civil Service Jobs API), pages fetched concurrently
+#   - ParquetJobsSource: the full job history as a status-partitioned Parquet dataset, scanned
+#     with filters pushed down and only the needed columns read
+# Every source reports a dataset version so the page can cache loaded data per version.
+import argparse
+import math
+import os
+import random
+import sqlite3
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+except ImportError:
+    pa = pc = ds = None
+
+JOB_COLUMNS = ["job_id", "job_title", "status", "views", "department", "posted_date"]
+STATUSES = ["Draft", "Advertised", "Closed"]
+PUBLISHED_STATUSES = ["Advertised", "Closed"]
+STATUS_DTYPE = pd.CategoricalDtype(STATUSES)
+
+DATA_DIR = os.getenv("DATA_DIR", ".data")
+
+MOCK_JOBS = [
+    {"job_id": "CSJ-0001", "job_title": "Senior Product Manager", "status": "Advertised", "views": 234, "department": "Cabinet Office", "posted_date": "2025-09-01"},
+    {"job_id": "CSJ-0002", "job_title": "Performance Analyst", "status": "Draft", "views": 0, "department": "HM Treasury", "posted_date": "2025-09-03"},
+    {"job_id": "CSJ-0003", "job_title": "Service Designer", "status": "Advertised", "views": 178, "department": "Home Office", "posted_date": "2025-09-08"},
+    {"job_id": "CSJ-0004", "job_title": "Interaction Designer", "status": "Closed", "views": 421, "department": "Cabinet Office", "posted_date": "2025-08-11"},
+    {"job_id": "CSJ-0005", "job_title": "Delivery Manager", "status": "Draft", "views": 0, "department": "Ministry of Justice", "posted_date": "2025-09-15"},
+    {"job_id": "CSJ-0006", "job_title": "Technical Architect", "status": "Closed", "views": 355, "department": "Home Office", "posted_date": "2025-07-21"},
+    {"job_id": "CSJ-0007", "job_title": "Recruitment Lead", "status": "Advertised", "views": 292, "department": "Cabinet Office", "posted_date": "2025-09-19"},
+]
+
+
+class JobsSource:
+    """A backend the insights page can load jobs from.
+
+    Sources with `pushdown = True` also answer filtered, projected queries
+    themselves (summarise/query/departments), so the page never loads every job.
+    """
+
+    name = "base"
+    pushdown = False
+
+    def version(self) -> str:
+        """Changes whenever the underlying data changes."""
+        raise NotImplementedError
+
+    def load_jobs(self) -> pd.DataFrame:
+        """All jobs, with JOB_COLUMNS."""
+        raise NotImplementedError
+
+
+class MockJobsSource(JobsSource):
+    name = "mock"
+
+    def version(self) -> str:
+        return "mock-1"
+
+    def load_jobs(self) -> pd.DataFrame:
+        return with_categories(pd.DataFrame(MOCK_JOBS, columns=JOB_COLUMNS))
+
+
+class SQLiteJobsSource(JobsSource):
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _connect(self):
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(
+                f"No jobs database at {self.path}. Build one with: python insights_data.py build-fixture"
+            )
+        return sqlite3.connect(self.path)
+
+    def version(self) -> str:
+        info = os.stat(self.path)
+        return f"{info.st_mtime_ns}-{info.st_size}"
+
+    def load_jobs(self) -> pd.DataFrame:
+        with closing(self._connect()) as conn:
+            return with_categories(pd.read_sql_query(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs", conn))
+
+
+class ApiJobsSource(JobsSource):
+    """Jobs API returning {"items": [...], "total": n, "version": "..."} for ?page=&page_size=."""
+
+    name = "api"
+
+    def __init__(self, base_url: str, api_key: str = None, page_size: int = 1000, max_workers: int = 8,
+                 timeout: float = 30):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.page_size = page_size
+        self.max_workers = max_workers
+        self.timeout = timeout
+
+    def _get_page(self, page: int, page_size: int = None) -> dict:
+        # shares the pooled session used for advert URLs
+        from url_fetch import get_session
+        headers = {"Accept": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        res = get_session().get(
+            f"{self.base_url}/jobs",
+            params={"page": page, "page_size": page_size or self.page_size},
+            headers=headers,
+            timeout=self.timeout,
+        )
+        res.raise_for_status()
+        return res.json()
+
+    def version(self) -> str:
+        first = self._get_page(1, page_size=1)
+        return str(first.get("version") or first.get("total"))
+
+    def load_jobs(self) -> pd.DataFrame:
+        first = self._get_page(1)
+        pages = max(1, math.ceil(first.get("total", 0) / self.page_size))
+        items = list(first.get("items", []))
+        if pages > 1:
+            # pool.map keeps page order
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                for data in pool.map(self._get_page, range(2, pages + 1)):
+                    items.extend(data.get("items", []))
+        return with_categories(pd.DataFrame(items, columns=JOB_COLUMNS))
+
+
+class ParquetJobsSource(JobsSource):
+    """Hive-partitioned (status=...) Parquet dataset, built with `build-fixture --format parquet`.
+
+    Status filters prune whole partitions, date and department filters are applied
+    during the scan, and only the requested columns are read, so memory scales
+    with the result rather than the dataset.
+    """
+
+    name = "parquet"
+    pushdown = True
+
+    def __init__(self, path: str):
+        if ds is None:
+            raise ImportError("pyarrow is required for JOBS_SOURCE=parquet")
+        self.path = path
+
+    def _dataset(self):
+        if not os.path.isdir(self.path):
+            raise FileNotFoundError(
+                f"No Parquet jobs dataset at {self.path}. "
+                "Build one with: python insights_data.py build-fixture --format parquet"
+            )
+        return ds.dataset(self.path, format="parquet", partitioning="hive")
+
+    def version(self) -> str:
+        files, latest, size = 0, 0, 0
+        for root, _, names in os.walk(self.path):
+            for name in names:
+                info = os.stat(os.path.join(root, name))
+                files += 1
+                latest = max(latest, info.st_mtime_ns)
+                size += info.st_size
+        return f"{files}-{latest}-{size}"
+
+    def load_jobs(self) -> pd.DataFrame:
+        return self.query(JOB_COLUMNS)
+
+    def query(self, columns: list, filters: dict = None) -> pd.DataFrame:
+        """Matching jobs with only `columns`, filters applied during the scan."""
+        return self._to_frame(self._dataset().to_table(columns=list(columns), filter=arrow_filter(filters)))
+
+    def page(self, columns: list, filters: dict = None, sort: str = None, descending: bool = False,
+             offset: int = 0, limit: int = 50) -> tuple:
+        """(rows, total): one page of matching jobs and the number of matches.
+
+        Only the sort column is read for every match; the page's own rows are
+        then taken by position, so a deep page costs the same as the first.
+        """
+        dataset = self._dataset()
+        expression = arrow_filter(filters)
+        if sort:
+            keys = dataset.to_table(columns=[sort], filter=expression).column(sort)
+            total = len(keys)
+            # sort_indices is stable, so ties keep dataset order as in order_jobs()
+            indices = pc.sort_indices(keys, sort_keys=[("", "descending" if descending else "ascending")])
+            indices = indices[offset:offset + limit]
+        else:
+            total = dataset.count_rows(filter=expression)
+            indices = pa.array(range(offset, min(offset + limit, total)), pa.int64())
+        if not len(indices):
+            return self._to_frame(pa.table({c: pa.array([], PARQUET_SCHEMA.field(c).type) for c in columns})), total
+        return self._to_frame(dataset.take(indices, columns=list(columns), filter=expression)), total
+
+    @staticmethod
+    def _to_frame(table) -> pd.DataFrame:
+        df = table.to_pandas()
+        if "posted_date" in df:
+            df["posted_date"] = df["posted_date"].astype(str)
+        return with_categories(df) if "status" in df else df
+
+    def summarise(self, filters: dict = None) -> dict:
+        """Scorecard metrics from the status and views columns alone."""
+        table = self._dataset().to_table(columns=["status", "views"], filter=arrow_filter(filters))
+        grouped = table.group_by("status").aggregate([
+            ("views", "sum"),
+            ("views", "count", pc.CountOptions(mode="all")),
+        ]).to_pydict()
+        counts = dict.fromkeys(STATUSES, 0)
+        views = dict.fromkeys(STATUSES, 0)
+        for status, total, n in zip(grouped["status"], grouped["views_sum"], grouped["views_count"]):
+            if status in counts:
+                counts[status] = int(n)
+                views[status] = int(total or 0)
+        return {
+            "counts": counts,
+            "views": views,
+            "total": table.num_rows,
+            "published_views": sum(views[s] for s in PUBLISHED_STATUSES),
+        }
+
+    def departments(self) -> list:
+        column = self._dataset().to_table(columns=["department"]).column("department")
+        return sorted(v for v in column.unique().to_pylist() if v)
+
+
+# --------------------------
+# FILTERS
+# --------------------------
+# filters are plain dicts so they can be cache keys:
+#   {"statuses": (...), "departments": (...), "start": date, "end": date, "title": "search text"}
+# missing or empty entries don't filter; "title" is a case-insensitive substring match
+
+
+def arrow_filter(filters: dict = None):
+    """The filters as a pyarrow dataset expression (None for no filter)."""
+    filters = filters or {}
+    parts = []
+    if filters.get("statuses"):
+        parts.append(ds.field("status").isin(list(filters["statuses"])))
+    if filters.get("departments"):
+        parts.append(ds.field("department").isin(list(filters["departments"])))
+    if filters.get("start"):
+        parts.append(ds.field("posted_date") >= pa.scalar(filters["start"], pa.date32()))
+    if filters.get("end"):
+        parts.append(ds.field("posted_date") <= pa.scalar(filters["end"], pa.date32()))
+    if filters.get("title"):
+        parts.append(pc.match_substring(ds.field("job_title"), filters["title"], ignore_case=True))
+    expression = None
+    for part in parts:
+        expression = part if expression is None else expression & part
+    return expression
+
+
+def filter_jobs(df: pd.DataFrame, filters: dict = None) -> pd.DataFrame:
+    """The same filters applied to an in-memory frame; returns `df` itself when nothing filters."""
+    filters = filters or {}
+    mask = None
+
+    def both(a, b):
+        return b if a is None else a & b
+
+    if filters.get("statuses"):
+        mask = both(mask, df["status"].isin(filters["statuses"]))
+    if filters.get("departments"):
+        mask = both(mask, df["department"].isin(filters["departments"]))
+    # posted_date is an ISO string, so string comparison is date comparison
+    if filters.get("start"):
+        mask = both(mask, df["posted_date"] >= filters["start"].isoformat())
+    if filters.get("end"):
+        mask = both(mask, df["posted_date"] <= filters["end"].isoformat())
+    if filters.get("title"):
+        mask = both(mask, _title_matches(df, filters["title"]))
+    return df if mask is None else df[mask.to_numpy()]
+
+
+def _title_matches(df: pd.DataFrame, text: str) -> pd.Series:
+    return df["job_title"].str.contains(text, case=False, regex=False, na=False)
+
+
+def order_jobs(df: pd.DataFrame, sort: str = None, descending: bool = False, title: str = None) -> np.ndarray:
+    """Row positions of `df` whose title contains `title`, in (stable) `sort` order.
+
+    Slice the result and pass it to df.iloc to get one page of a table.
+    """
+    positions = np.arange(len(df))
+    if title:
+        positions = positions[_title_matches(df, title).to_numpy()]
+    if sort:
+        keys = df[sort].iloc[positions].reset_index(drop=True)
+        positions = positions[keys.sort_values(ascending=not descending, kind="stable").index.to_numpy()]
+    return positions
+
+
+def with_categories(df: pd.DataFrame) -> pd.DataFrame:
+    """Store status as a categorical so grouping works on small integer codes."""
+    if not isinstance(df["status"].dtype, pd.CategoricalDtype):
+        df["status"] = df["status"].astype(STATUS_DTYPE)
+    return df
+
+
+# --------------------------
+# AGGREGATION
+# --------------------------
+def summarise_jobs(df: pd.DataFrame) -> dict:
+    """Scorecard metrics and per-status row positions from a single grouping pass.
+
+    Groups on the categorical status codes: one bincount gives the counts, a
+    weighted one the views, and one stable sort of the codes gives every status's
+    row positions. Returns {"counts": {status: n}, "views": {status: total},
+    "total": n, "published_views": total, "rows": {status: positions}}, which feeds
+    both the scorecards and the per-status tables.
+    """
+    status = df["status"]
+    if not isinstance(status.dtype, pd.CategoricalDtype) or list(status.cat.categories) != STATUSES:
+        status = status.astype(STATUS_DTYPE)
+    # shift by one so unknown statuses (code -1) land in bucket 0; the codes stay
+    # int8, which keeps the stable sort a radix sort
+    codes = status.cat.codes.to_numpy() + 1
+    buckets = len(STATUSES) + 1
+    counts = np.bincount(codes, minlength=buckets)
+    views = np.bincount(codes, weights=df["views"].to_numpy(dtype=float, na_value=0), minlength=buckets)
+    positions = np.split(np.argsort(codes, kind="stable"), np.cumsum(counts)[:-1])
+
+    view_totals = {s: int(views[i + 1]) for i, s in enumerate(STATUSES)}
+    return {
+        "counts": {s: int(counts[i + 1]) for i, s in enumerate(STATUSES)},
+        "views": view_totals,
+        "total": len(df),
+        "published_views": sum(view_totals[s] for s in PUBLISHED_STATUSES),
+        "rows": {s: positions[i + 1] for i, s in enumerate(STATUSES)},
+    }
+
+
+def status_table(df: pd.DataFrame, summary: dict, status: str, columns: list) -> pd.DataFrame:
+    """Rows of one status, only the requested columns, copied once."""
+    return df.iloc[summary["rows"][status], [df.columns.get_loc(c) for c in columns]]
+
+
+def get_source() -> JobsSource:
+    """The source configured by JOBS_SOURCE (mock, sqlite, parquet or api)."""
+    kind = os.getenv("JOBS_SOURCE", "mock")
+    if kind == "sqlite":
+        return SQLiteJobsSource(os.getenv("JOBS_DB_PATH", os.path.join(DATA_DIR, "jobs.sqlite3")))
+    if kind == "parquet":
+        return ParquetJobsSource(os.getenv("JOBS_PARQUET_PATH", os.path.join(DATA_DIR, "jobs_parquet")))
+    if kind == "api":
+        return ApiJobsSource(
+            os.getenv("JOBS_API_URL", ""),
+            api_key=os.getenv("JOBS_API_KEY"),
+            page_size=int(os.getenv("JOBS_API_PAGE_SIZE", "1000")),
+            max_workers=int(os.getenv("JOBS_API_WORKERS", "8")),
+        )
+    return MockJobsSource()
+
+
+# --------------------------
+# LOCAL FIXTURE
+# --------------------------
+FIXTURE_TITLES = [
+    "Senior Product Manager", "Performance Analyst", "Service Designer", "Interaction Designer",
+    "Delivery Manager", "Technical Architect", "Recruitment Lead", "Policy Advisor",
+    "Data Scientist", "Content Designer", "User Researcher", "Software Developer",
+    "Project Manager", "Finance Business Partner", "HR Advisor", "Operational Delivery Officer",
+]
+FIXTURE_DEPARTMENTS = [
+    "Cabinet Office", "HM Treasury", "Home Office", "Ministry of Justice", "Ministry of Defence",
+    "HM Revenue and Customs", "Department for Work and Pensions", "Department for Education",
+    "Department for Transport", "Department of Health and Social Care",
+]
+
+
+def _fixture_batches(rows: int, seed: int, batch: int):
+    """Random jobs as lists of JOB_COLUMNS tuples, `batch` at a time."""
+    rng = random.Random(seed)
+    start = date.today() - timedelta(days=3 * 365)
+    for offset in range(0, rows, batch):
+        chunk = []
+        for n in range(offset, min(offset + batch, rows)):
+            status = rng.choices(STATUSES, weights=(1, 3, 6))[0]
+            views = 0 if status == "Draft" else rng.randint(0, 2000)
+            posted = start + timedelta(days=rng.randint(0, 3 * 365))
+            chunk.append((
+                f"CSJ-{n + 1:07d}", rng.choice(FIXTURE_TITLES), status, views,
+                rng.choice(FIXTURE_DEPARTMENTS), posted.isoformat(),
+            ))
+        yield chunk
+
+
+def build_fixture(path: str, rows: int = 1_000_000, seed: int = 42, batch: int = 50_000):
+    """Write a SQLite jobs table of `rows` random jobs, replacing any existing file."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if os.path.exists(path):
+        os.remove(path)
+    with closing(sqlite3.connect(path)) as conn:
+        conn.execute(
+            "CREATE TABLE jobs (job_id TEXT PRIMARY KEY, job_title TEXT, status TEXT, "
+            "views INTEGER, department TEXT, posted_date TEXT)"
+        )
+        for chunk in _fixture_batches(rows, seed, batch):
+            conn.executemany("INSERT INTO jobs VALUES (?, ?, ?, ?, ?, ?)", chunk)
+        conn.execute("CREATE INDEX jobs_status ON jobs (status)")
+        conn.commit()
+
+
+PARQUET_SCHEMA = None if pa is None else pa.schema([
+    ("job_id", pa.string()),
+    ("job_title", pa.string()),
+    ("status", pa.string()),
+    ("views", pa.int64()),
+    ("department", pa.string()),
+    ("posted_date", pa.date32()),
+])
+
+
+def build_parquet_fixture(path: str, rows: int = 1_000_000, seed: int = 42, batch: int = 50_000):
+    """Write the same random jobs as a status-partitioned Parquet dataset, replacing `path`.
+
+    Rows are sorted by posted_date so row-group statistics let date filters skip
+    whole row groups.
+    """
+    if pa is None:
+        raise ImportError("pyarrow is required to build a Parquet dataset")
+    import shutil
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    batches = []
+    for chunk in _fixture_batches(rows, seed, batch):
+        columns = list(zip(*chunk))
+        columns[5] = [date.fromisoformat(d) for d in columns[5]]
+        batches.append(pa.RecordBatch.from_arrays(
+            [pa.array(col, type=field.type) for col, field in zip(columns, PARQUET_SCHEMA)],
+            schema=PARQUET_SCHEMA,
+        ))
+    table = pa.Table.from_batches(batches, schema=PARQUET_SCHEMA).sort_by("posted_date")
+    ds.write_dataset(
+        table, path, format="parquet", partitioning=["status"], partitioning_flavor="hive",
+        max_rows_per_group=64 * 1024,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Data insights data tools.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    fixture = sub.add_parser("build-fixture", help="build the local SQLite stand-in for GRID")
+    fixture.add_argument("--format", choices=["sqlite", "parquet"], default="sqlite")
+    fixture.add_argument("--path", default=None, help="defaults to JOBS_DB_PATH / JOBS_PARQUET_PATH locations")
+    fixture.add_argument("--rows", type=int, default=1_000_000)
+    fixture.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    if args.command == "build-fixture":
+        if args.format == "parquet":
+            path = args.path or os.path.join(DATA_DIR, "jobs_parquet")
+            build_parquet_fixture(path, rows=args.rows, seed=args.seed)
+        else:
+            path = args.path or os.path.join(DATA_DIR, "jobs.sqlite3")
+            build_fixture(path, rows=args.rows, seed=args.seed)
+        print(f"Wrote {args.rows} jobs to {path}")
+
+
+if __name__ == "__main__":
+    main()
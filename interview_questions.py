@@ -0,0 +1,213 @@
+# interview_questions.py
+# Interview question generation for the Interview question generator page. Like
+# advert_pipeline.py, nothing in here touches Streamlit.
+#
+# Requests are laid out for provider-side prompt caching: the fixed instructions and
+# rules go first, identical on every call, and only the hiring manager's answers
+# follow. Results are also memoised in llm_cache keyed by the normalised answers, so
+# running the same role again (e.g. for another panel) returns instantly. Asking to
+# regenerate passes refresh=True, which calls the model again and replaces the memo.
+#
+# generate_variants() drafts several alternative sets concurrently, so the hiring
+# manager can pick and mix questions instead of waiting for a regeneration.
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import metrics
+import openai_gateway
+from cache import llm_cache, llm_key
+
+INTERVIEW_MODEL = os.getenv("INTERVIEW_MODEL", "gpt-4.1-mini")
+
+# bump this when INSTRUCTIONS change so memoised questions are not reused
+INTERVIEW_PROMPT_VERSION = "1"
+
+# requests sharing this key (and so the same instructions prefix) are routed to the
+# same provider-side prompt cache
+PROMPT_CACHE_KEY = f"interview-questions-v{INTERVIEW_PROMPT_VERSION}"
+
+# the stable prefix: never put anything request-specific in here
+INSTRUCTIONS = """
+You are an experienced Civil Service / public sector interviewer.
+Generate 6-8 interview questions tailored to the role described in the input.
+
+Rules:
+- Mix in competency/behavioural questions relevant to UK Civil Service context if appropriate.
+- Ask for evidence (STAR) where relevant.
+- Keep questions short and plain English.
+- Group them by ‘Core’, ‘Behavioural’, ‘Scenario’.
+""".strip()
+
+# alternative question sets drafted side by side, and how long to wait for them
+INTERVIEW_VARIANTS = int(os.getenv("INTERVIEW_VARIANTS", "1"))  # 1: a single set in the chat
+INTERVIEW_TIMEOUT = float(os.getenv("INTERVIEW_TIMEOUT", "60"))  # seconds
+
+# reading individual questions back out of a generated set
+LIST_MARKER = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+")
+HEADING = re.compile(r"^\s*(?:#+\s*)?(?:\*\*)?([^*?]{1,60}?)(?:\*\*)?:?\s*$")
+
+# answer id -> (label in the request, value when not answered)
+ANSWER_FIELDS = {
+    "role_title": ("Role title", "the role"),
+    "grade_level": ("Level/Grade", ""),
+    "core_capabilities": ("Core skills/behaviours to assess", ""),
+    "experience_focus": ("Priority style (technical / situational / past behaviour)", ""),
+    "role_context": ("Role context", ""),
+}
+
+
+def normalise_answers(answers: dict) -> dict:
+    """The answers used in a request: every field present, whitespace collapsed."""
+    normalised = {}
+    for field, (_, default) in ANSWER_FIELDS.items():
+        value = " ".join(str(answers.get(field) or "").split())
+        normalised[field] = value or default
+    return normalised
+
+
+def answers_input(answers: dict, variant: int = 0) -> str:
+    """The variable part of the request, after the cached instructions.
+
+    Variant 0 is the standard request; later variants ask for a set that differs
+    from the others, so side-by-side drafts aren't near-duplicates.
+    """
+    normalised = normalise_answers(answers)
+    text = "\n".join(f"{label}: {normalised[field]}" for field, (label, _) in ANSWER_FIELDS.items())
+    if variant:
+        text += (
+            f"\n\nThis is alternative set {variant + 1}. Choose different questions, scenarios "
+            "and wording from a first-choice set for the same role."
+        )
+    return text
+
+
+def questions_key(answers: dict, variant: int = 0) -> str:
+    # case and spacing differences don't change the questions worth asking
+    key_answers = {field: value.casefold() for field, value in normalise_answers(answers).items()}
+    if variant:
+        key_answers["variant"] = variant
+    return llm_key(INTERVIEW_MODEL, None, INTERVIEW_PROMPT_VERSION, json.dumps(key_answers, sort_keys=True))
+
+
+def cached_questions(answers: dict, variant: int = 0):
+    """Questions from an earlier run with the same answers, or None."""
+    return llm_cache.get(questions_key(answers, variant))
+
+
+def _request_args(answers: dict, variant: int = 0) -> dict:
+    return {
+        "model": INTERVIEW_MODEL,
+        "instructions": INSTRUCTIONS,
+        "input": answers_input(answers, variant),
+        "prompt_cache_key": PROMPT_CACHE_KEY,
+    }
+
+
+def request_questions(answers: dict, variant: int = 0, timeout: float = None, refresh: bool = False) -> str:
+    """Generated interview questions for the answers. Raises on failure.
+
+    With `refresh`, the memoised questions are ignored and replaced by a new set.
+    """
+    key = questions_key(answers, variant)
+    cached = None if refresh else llm_cache.get(key)
+    if cached is not None:
+        return cached
+
+    resp = openai_gateway.create("responses", **_request_args(answers, variant), timeout=timeout)
+    text = resp.output_text.strip()
+    llm_cache.set(key, text)
+    return text
+
+
+def stream_questions(answers: dict, variant: int = 0, timeout: float = None, refresh: bool = False):
+    """Yield the generated questions as text deltas arrive. Raises on failure."""
+    key = questions_key(answers, variant)
+    cached = None if refresh else llm_cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+
+    stream = openai_gateway.create("responses", **_request_args(answers, variant), stream=True, timeout=timeout)
+    parts = []
+    for event in stream:
+        if event.type == "response.output_text.delta":
+            parts.append(event.delta)
+            yield event.delta
+    llm_cache.set(key, "".join(parts).strip())
+
+
+def _collect_stream(answers: dict, variant: int, timeout: float, refresh: bool, partial: dict) -> str:
+    # runs in a worker thread; the caller renders `partial` as it grows
+    parts = []
+    for delta in stream_questions(answers, variant, timeout, refresh):
+        parts.append(delta)
+        partial[variant] = "".join(parts)
+    return "".join(parts).strip()
+
+
+def generate_variants(answers: dict, count: int = INTERVIEW_VARIANTS, timeout: float = INTERVIEW_TIMEOUT,
+                      placeholders: list = None, refresh: bool = False) -> tuple:
+    """Draft `count` alternative question sets concurrently.
+
+    Returns (sets, failed): `sets` has one entry per variant, None for a variant
+    that errored or ran past `timeout` (its index is also listed in `failed`), so
+    the finished sets are still kept. If `placeholders` holds one `st.empty()` slot
+    per variant, each set is streamed into its slot as it is written. `refresh`
+    drafts new sets instead of returning the memoised ones.
+    """
+    executor = ThreadPoolExecutor(max_workers=max(1, count))
+    deadline = time.monotonic() + timeout
+    if placeholders:
+        partial = {}
+        futures = [executor.submit(metrics.bind(_collect_stream), answers, v, timeout, refresh, partial)
+                   for v in range(count)]
+        while time.monotonic() < deadline and not all(fut.done() for fut in futures):
+            for v, slot in enumerate(placeholders):
+                if v in partial:
+                    slot.markdown(partial[v])
+            time.sleep(0.1)
+    else:
+        futures = [executor.submit(metrics.bind(request_questions), answers, v, timeout, refresh) for v in range(count)]
+
+    sets, failed = [], []
+    try:
+        for v, future in enumerate(futures):
+            try:
+                sets.append(future.result(timeout=max(0.0, deadline - time.monotonic())))
+            except FutureTimeoutError:
+                future.cancel()
+                sets.append(None)
+                failed.append(v)
+            except Exception:
+                sets.append(None)
+                failed.append(v)
+    finally:
+        # don't block the caller on stragglers; the request timeout ends them
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    if placeholders:
+        for v, text in enumerate(sets):
+            if text is not None:
+                placeholders[v].markdown(text)
+    return sets, failed
+
+
+def question_items(text: str) -> list:
+    """(group, question) pairs from a generated set, for picking individual questions.
+
+    Short lines without a question mark that aren't list items are read as group
+    headings (e.g. "Core" or "**Behavioural**").
+    """
+    items, group = [], ""
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        heading = None if LIST_MARKER.match(line) else HEADING.match(line)
+        if heading:
+            group = heading.group(1).strip().rstrip(":")
+            continue
+        items.append((group, LIST_MARKER.sub("", line).strip()))
+    return items
@@ -0,0 +1,80 @@
+# llm_client.py
+# One OpenAI client per process, shared by every page.
+# Streamlit re-executes page scripts on each interaction, but imported modules stay
+# loaded, so the client (and its keep-alive connection pool) is only built once.
+# The OpenAI SDK and httpx2, the HTTP library it is built on, are imported when the
+# client is first needed, not at page load.
+# The SDK's own retries are off: calls go through openai_gateway.py, which retries
+# under the process-wide rate limits.
+import os
+import threading
+
+import metrics
+
+MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "10"))
+KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60"))  # seconds
+REQUEST_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))  # seconds
+CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))  # seconds
+USE_HTTP2 = os.getenv("OPENAI_HTTP2", "0") == "1"
+
+_client = None
+_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {"requests": 0, "new_connections": 0}
+
+
+def _trace(event_name: str, info: dict):
+    # httpcore2 reports every new TCP connection and every request sent, so the
+    # difference is the number of requests that went over a reused connection
+    if event_name == "connection.connect_tcp.complete":
+        with _stats_lock:
+            _stats["new_connections"] += 1
+    elif event_name.endswith("send_request_headers.started"):
+        with _stats_lock:
+            _stats["requests"] += 1
+
+
+def _attach_trace(request):
+    request.extensions["trace"] = _trace
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def get_client():
+    """Return the process-wide OpenAI client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                from httpx2 import Limits, Timeout
+                from openai import DefaultHttpxClient, OpenAI
+
+                http_client = DefaultHttpxClient(
+                    limits=Limits(
+                        max_connections=MAX_CONNECTIONS,
+                        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                        keepalive_expiry=KEEPALIVE_EXPIRY,
+                    ),
+                    timeout=Timeout(REQUEST_TIMEOUT, connect=CONNECT_TIMEOUT),
+                    http2=USE_HTTP2 and _http2_available(),
+                    event_hooks={"request": [_attach_trace]},
+                )
+                _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=http_client, max_retries=0)
+    return _client
+
+
+def connection_stats() -> dict:
+    """Requests sent, connections opened, and how many requests reused a connection."""
+    with _stats_lock:
+        requests, new = _stats["requests"], _stats["new_connections"]
+    return {"requests": requests, "new_connections": new, "reused_connections": max(0, requests - new)}
+
+
+metrics.register_gauges("openai_connections", connection_stats)
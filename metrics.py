@@ -0,0 +1,322 @@
+# metrics.py
+# In-process instrumentation: where the time goes (URL fetch, parsing, LLM calls,
+# background jobs, page reruns), LLM token usage and cache hit rates.
+#
+# Timings go into fixed-bucket histograms per stage, and every span is tagged with
+# the trace id of the page run that caused it (background and worker threads keep
+# the id of the run that submitted them). Everything is kept in memory for the
+# life of the process and rendered as Prometheus text: on the Performance page,
+# and at http://<host>:METRICS_PORT/metrics when METRICS_PORT is set.
+#
+# With METRICS_ENABLED=0, stage() hands back a shared no-op, @timed leaves the
+# function as it was, and the record_* helpers return straight away.
+import contextvars
+import functools
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+from cache import CACHES
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # 0: no separate endpoint
+RECENT_SPANS = int(os.getenv("METRICS_RECENT_SPANS", "500"))
+
+PREFIX = "recruitment_hub"
+
+# histogram bucket upper bounds, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_trace = contextvars.ContextVar("trace", default=None)
+_lock = threading.Lock()
+_histograms = {}  # stage -> Histogram
+_errors = {}  # stage -> count
+_tokens = {}  # (model, kind) -> count
+_gauges = {}  # name -> function returning {key: number}
+_spans = deque(maxlen=RECENT_SPANS)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.min = self.max = None
+
+    def observe(self, seconds: float):
+        i = 0
+        while i < len(BUCKETS) and seconds > BUCKETS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.sum += seconds
+        self.count += 1
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def quantile(self, q: float) -> float:
+        """Estimated by interpolating inside the bucket the quantile falls in."""
+        if not self.count:
+            return 0.0
+        rank, seen, lower = q * self.count, 0, 0.0
+        for i, n in enumerate(self.counts):
+            upper = BUCKETS[i] if i < len(BUCKETS) else self.max
+            if n and seen + n >= rank:
+                estimate = lower + (upper - lower) * (rank - seen) / n
+                return min(max(estimate, self.min), self.max)
+            seen += n
+            lower = upper
+        return self.max
+
+
+# --------------------------
+# TRACES
+# --------------------------
+def start_trace(name: str = "") -> str:
+    """Begin a new trace (one per page run) and return its id."""
+    if not METRICS_ENABLED:
+        return ""
+    _ensure_server()
+    trace_id = uuid.uuid4().hex[:16]
+    _trace.set((trace_id, name, time.perf_counter()))
+    return trace_id
+
+
+def current_trace() -> str:
+    trace = _trace.get()
+    return trace[0] if trace else ""
+
+
+def end_trace():
+    """Record the page run started by start_trace() as the "page.<name>" stage."""
+    trace = _trace.get()
+    if trace and trace[1]:
+        observe(f"page.{trace[1]}", time.perf_counter() - trace[2])
+
+
+def bind(fn):
+    """`fn`, run in a copy of the caller's context, so work on another thread keeps its trace id."""
+    if not METRICS_ENABLED:
+        return fn
+    ctx = contextvars.copy_context()
+    return functools.wraps(fn)(lambda *args, **kwargs: ctx.run(fn, *args, **kwargs))
+
+
+def trace_spans(trace_id: str) -> list:
+    with _lock:
+        return [span for span in _spans if span["trace"] == trace_id]
+
+
+def recent_spans() -> list:
+    with _lock:
+        return list(_spans)
+
+
+# --------------------------
+# RECORDING
+# --------------------------
+def observe(stage_name: str, seconds: float, error: bool = False):
+    if not METRICS_ENABLED:
+        return
+    with _lock:
+        hist = _histograms.get(stage_name)
+        if hist is None:
+            hist = _histograms[stage_name] = Histogram()
+        hist.observe(seconds)
+        if error:
+            _errors[stage_name] = _errors.get(stage_name, 0) + 1
+        _spans.append({"trace": current_trace(), "stage": stage_name, "ms": seconds * 1000,
+                       "error": error, "at": time.time()})
+
+
+class _Stage:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe(self.name, time.perf_counter() - self.started, error=exc_type is not None)
+        return False
+
+
+class _NoStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+def stage(name: str):
+    """Time the enclosed block as `name`; an exception marks the span as an error."""
+    return _Stage(name) if METRICS_ENABLED else _NO_STAGE
+
+
+def timed(name: str):
+    """Decorator form of stage()."""
+    def decorate(fn):
+        if not METRICS_ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def record_usage(model: str, usage):
+    """Token counts from an OpenAI `usage` object (Chat Completions or Responses)."""
+    if not METRICS_ENABLED or usage is None:
+        return
+    prompt = getattr(usage, "prompt_tokens", None) or getattr(usage, "input_tokens", None) or 0
+    completion = getattr(usage, "completion_tokens", None) or getattr(usage, "output_tokens", None) or 0
+    details = getattr(usage, "prompt_tokens_details", None) or getattr(usage, "input_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) or 0
+    with _lock:
+        for kind, n in (("prompt", prompt), ("completion", completion), ("cached_prompt", cached)):
+            _tokens[(model, kind)] = _tokens.get((model, kind), 0) + n
+
+
+def register_gauges(name: str, fn):
+    """Export the numbers in `fn()` (a flat dict) as <prefix>_<name>_<key> gauges."""
+    _gauges[name] = fn
+
+
+# --------------------------
+# READING
+# --------------------------
+def stage_summary() -> list:
+    """One row per stage: count, errors, and mean / p50 / p95 in ms."""
+    with _lock:
+        items = sorted(_histograms.items())
+        errors = dict(_errors)
+    return [
+        {
+            "stage": name,
+            "count": hist.count,
+            "errors": errors.get(name, 0),
+            "mean_ms": round(hist.sum / hist.count * 1000, 1),
+            "p50_ms": round(hist.quantile(0.5) * 1000, 1),
+            "p95_ms": round(hist.quantile(0.95) * 1000, 1),
+        }
+        for name, hist in items
+    ]
+
+
+def token_summary() -> list:
+    with _lock:
+        tokens = dict(_tokens)
+    models = sorted({model for model, _ in tokens})
+    return [
+        {"model": model, **{kind: tokens.get((model, kind), 0) for kind in ("prompt", "cached_prompt", "completion")}}
+        for model in models
+    ]
+
+
+def cache_summary() -> list:
+    return [{"cache": name, **cache.stats()} for name, cache in sorted(CACHES.items())]
+
+
+def gauge_values() -> dict:
+    values = {}
+    for name, fn in list(_gauges.items()):
+        try:
+            values.update({f"{name}_{key}": value for key, value in fn().items()
+                           if isinstance(value, (int, float))})
+        except Exception:
+            continue  # a broken collector shouldn't take the endpoint down
+    return values
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{k}="{str(v).replace(chr(34), "")}"' for k, v in labels.items()) + "}"
+
+
+def prometheus_text() -> str:
+    """Everything recorded so far, in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        histograms = {name: (list(h.counts), h.sum, h.count) for name, h in _histograms.items()}
+        errors = dict(_errors)
+        tokens = dict(_tokens)
+
+    metric = f"{PREFIX}_stage_seconds"
+    lines += [f"# HELP {metric} Time spent per stage.", f"# TYPE {metric} histogram"]
+    for name, (counts, total, count) in sorted(histograms.items()):
+        cumulative = 0
+        for bound, n in zip(list(BUCKETS) + ["+Inf"], counts):
+            cumulative += n
+            lines.append(f"{metric}_bucket{_labels(stage=name, le=bound)} {cumulative}")
+        lines.append(f"{metric}_sum{_labels(stage=name)} {total:.6f}")
+        lines.append(f"{metric}_count{_labels(stage=name)} {count}")
+
+    metric = f"{PREFIX}_stage_errors_total"
+    lines += [f"# HELP {metric} Stage runs that raised.", f"# TYPE {metric} counter"]
+    lines += [f"{metric}{_labels(stage=name)} {n}" for name, n in sorted(errors.items())]
+
+    metric = f"{PREFIX}_llm_tokens_total"
+    lines += [f"# HELP {metric} OpenAI tokens by model and kind.", f"# TYPE {metric} counter"]
+    lines += [f"{metric}{_labels(model=model, kind=kind)} {n}" for (model, kind), n in sorted(tokens.items())]
+
+    metric = f"{PREFIX}_cache_lookups_total"
+    lines += [f"# HELP {metric} Cache lookups by result.", f"# TYPE {metric} counter"]
+    for row in cache_summary():
+        for result in ("memory_hits", "disk_hits", "misses"):
+            lines.append(f"{metric}{_labels(cache=row['cache'], result=result)} {row[result]}")
+
+    for key, value in sorted(gauge_values().items()):
+        lines += [f"# TYPE {PREFIX}_{key} gauge", f"{PREFIX}_{key} {value}"]
+    return "\n".join(lines) + "\n"
+
+
+# --------------------------
+# ENDPOINT
+# --------------------------
+_server = None
+
+
+def _ensure_server():
+    global _server
+    if _server is not None or not METRICS_PORT:
+        return
+    with _lock:
+        if _server is None:
+            _server = _serve(METRICS_PORT) or False  # False: port taken, don't try again
+
+
+def _serve(port: int):
+    # http.server is only imported when the endpoint is switched on
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # scrapes would flood the app log
+
+    try:
+        server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+    except OSError:
+        return None  # e.g. another process on this host already serves it
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
@@ -0,0 +1,266 @@
+# openai_gateway.py
+# Every OpenAI call goes through here, so the whole process (all pages, sessions and
+# background jobs) shares one view of the account's rate limits:
+#   - token buckets for requests/min and tokens/min hold calls back before they would
+#     be rejected, instead of sending bursts that come back as 429s;
+#   - retryable failures (429, 5xx, timeouts, dropped connections) are retried with
+#     exponential backoff and full jitter, waiting at least as long as Retry-After, and a
+#     429 pauses every caller, not just the one that got it;
+#   - identical non-streaming requests in flight at the same time (e.g. two sessions
+#     optimising the same advert) share one upstream call.
+# The SDK's own retries are off (see llm_client.py) so attempts aren't multiplied.
+# Like llm_client.py, nothing from the OpenAI SDK is imported here.
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+import metrics
+from llm_client import get_client
+
+RATE_LIMIT_RPM = float(os.getenv("OPENAI_RPM", "500"))  # 0 turns the limiter off
+RATE_LIMIT_TPM = float(os.getenv("OPENAI_TPM", "200000"))  # 0 turns the limiter off
+MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "5"))
+BACKOFF_BASE = float(os.getenv("OPENAI_BACKOFF_BASE", "0.5"))  # seconds
+BACKOFF_MAX = float(os.getenv("OPENAI_BACKOFF_MAX", "30"))  # seconds
+
+# output budgeted for a call that doesn't set max_tokens / max_output_tokens
+EXPECTED_OUTPUT_TOKENS = int(os.getenv("OPENAI_EXPECTED_OUTPUT_TOKENS", "512"))
+CHARS_PER_TOKEN = 4  # rough average for English text
+
+RETRYABLE_STATUS = {408, 409, 429}
+RETRYABLE_ERRORS = ("APIConnectionError", "APITimeoutError")
+
+
+# --------------------------
+# RATE LIMITING
+# --------------------------
+class TokenBucket:
+    """A limit of `per_minute` units, refilled continuously, allowing a burst of a full minute."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float = 1) -> float:
+        """Block until `amount` is available and take it. Returns the seconds waited."""
+        if self.rate <= 0:
+            return 0.0
+        amount = min(amount, self.capacity)  # a call bigger than the bucket still gets through, alone
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    def adjust(self, amount: float):
+        """Charge (or refund, if negative) the difference once the real cost is known."""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+def estimate_tokens(kwargs: dict) -> int:
+    """Tokens a request counts against the TPM limit: its text plus the output it may produce."""
+    chars = len(kwargs.get("instructions") or "")
+    for item in [kwargs.get("input")] + list(kwargs.get("messages") or []):
+        if isinstance(item, dict):
+            item = item.get("content")
+        if isinstance(item, str):
+            chars += len(item)
+    output = kwargs.get("max_tokens") or kwargs.get("max_output_tokens") or EXPECTED_OUTPUT_TOKENS
+    return chars // CHARS_PER_TOKEN + output
+
+
+# --------------------------
+# RETRIES
+# --------------------------
+def _retryable(e: Exception) -> bool:
+    status = getattr(e, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS or status >= 500
+    return type(e).__name__ in RETRYABLE_ERRORS
+
+
+def _retry_after(e: Exception):
+    """Seconds the server asked us to wait, if it said."""
+    headers = getattr(getattr(e, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass  # an HTTP date; fall back to our own backoff
+    return None
+
+
+def backoff_delay(attempt: int, retry_after: float = None) -> float:
+    """Full-jitter exponential backoff, never shorter than Retry-After."""
+    delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+    if retry_after is not None:
+        delay += retry_after
+    return delay
+
+
+# --------------------------
+# GATEWAY
+# --------------------------
+class OpenAIGateway:
+    def __init__(self, rpm: float = RATE_LIMIT_RPM, tpm: float = RATE_LIMIT_TPM, max_retries: int = MAX_RETRIES):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_retries = max_retries
+        self._paused_until = 0.0
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "upstream": 0, "coalesced": 0, "retries": 0, "rate_limited": 0,
+                       "failed": 0, "throttled_seconds": 0.0}
+
+    def create(self, endpoint: str, **kwargs):
+        """`client.<endpoint>.create(**kwargs)` under the shared limits, e.g. create("responses", ...).
+
+        Raises the last error once retries are used up. Streams are rate limited and
+        retried until the stream opens, but are never shared.
+        """
+        self._count("calls")
+        if kwargs.get("stream"):
+            return self._call(endpoint, kwargs)
+
+        key = hashlib.sha256(
+            json.dumps([endpoint, {k: v for k, v in kwargs.items() if k != "timeout"}], sort_keys=True, default=str)
+            .encode("utf-8")
+        ).hexdigest()
+        with self._lock:
+            shared = self._inflight.get(key)
+            if shared is None:
+                future = self._inflight[key] = Future()
+        if shared is not None:
+            self._count("coalesced")
+            return shared.result()
+
+        try:
+            result = self._call(endpoint, kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _call(self, endpoint: str, kwargs: dict):
+        resource = get_client()
+        for part in endpoint.split("."):
+            resource = getattr(resource, part)
+        estimate = estimate_tokens(kwargs)
+        started = time.perf_counter()
+        deadline = time.monotonic() + kwargs["timeout"] if kwargs.get("timeout") else None
+
+        for attempt in range(self.max_retries + 1):
+            self._wait_for_capacity(estimate)
+            self._count("upstream")
+            try:
+                resp = resource.create(**kwargs)
+            except Exception as e:
+                delay = backoff_delay(attempt, _retry_after(e))
+                if (not _retryable(e) or attempt == self.max_retries
+                        or (deadline is not None and time.monotonic() + delay > deadline)):
+                    self._count("failed")
+                    metrics.observe(f"llm.{endpoint}", time.perf_counter() - started, error=True)
+                    raise
+                if getattr(e, "status_code", None) == 429:
+                    # the account is over its limit: hold everyone back, not just this call
+                    self._count("rate_limited")
+                    with self._lock:
+                        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                self._count("retries")
+                time.sleep(delay)
+                continue
+
+            if kwargs.get("stream"):
+                return self._metered_stream(resp, endpoint, kwargs.get("model"), estimate, started)
+            self._settle(kwargs.get("model"), getattr(resp, "usage", None), estimate)
+            metrics.observe(f"llm.{endpoint}", time.perf_counter() - started)
+            return resp
+
+    def _metered_stream(self, stream, endpoint: str, model: str, estimate: int, started: float):
+        # the call is only over once the stream is, so time it (and read usage) from here
+        first, failed = None, False
+        try:
+            for item in stream:
+                if first is None:
+                    first = time.perf_counter()
+                    metrics.observe(f"llm.{endpoint}.first_event", first - started)
+                # chat chunks carry usage with stream_options={"include_usage": True};
+                # Responses streams put it on the final response.completed event
+                usage = getattr(item, "usage", None) or getattr(getattr(item, "response", None), "usage", None)
+                if usage is not None:
+                    self._settle(model, usage, estimate)
+                yield item
+        except Exception:
+            failed = True
+            raise
+        finally:
+            metrics.observe(f"llm.{endpoint}", time.perf_counter() - started, error=failed)
+
+    def _settle(self, model: str, usage, estimate: int):
+        """Correct the TPM bucket with the real token count, and record it."""
+        used = getattr(usage, "total_tokens", None)
+        if used is not None:
+            self.tokens.adjust(used - estimate)
+        metrics.record_usage(model, usage)
+
+    def _wait_for_capacity(self, estimate: int):
+        waited = max(0.0, self._paused_until - time.monotonic())
+        if waited:
+            time.sleep(waited)
+        waited += self.requests.acquire(1)
+        waited += self.tokens.acquire(estimate)
+        if waited:
+            with self._lock:
+                self._stats["throttled_seconds"] += waited
+            metrics.observe("llm.throttled", waited)
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["throttled_seconds"] = round(stats["throttled_seconds"], 2)
+        return stats
+
+
+# one gateway per process, shared by every page, session and background job
+gateway = OpenAIGateway()
+metrics.register_gauges("openai_gateway", gateway.stats)
+
+
+def create(endpoint: str, **kwargs):
+    return gateway.create(endpoint, **kwargs)
+
+
+def gateway_stats() -> dict:
+    return gateway.stats()
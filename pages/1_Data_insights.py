@@ -1,36 +1,174 @@
 from password_gate import require_password
 require_password()
+import os
+
 import streamlit as st
-import pandas as pd
+
+import metrics
+from insights_data import filter_jobs, get_source, order_jobs, status_table, summarise_jobs
+from rollups import get_store
 
 st.set_page_config(page_title="Recruitment hub - Home", layout="wide")
+metrics.start_trace("insights")
 
 st.title("Recruitment hub (mock)")
 
 st.info('The hub (lightweight UI) could provide reporting services like this via a GRID data connection or by talking to the future Civil Service Jobs APIs.', icon="ℹ️")
 
 # ----------------------------------
-# 1. Mock data
+# 1. Data (source chosen by JOBS_SOURCE: mock, sqlite, parquet or api)
 # ----------------------------------
+# Sources with pushdown (parquet) answer each filtered, projected query themselves;
+# the others are loaded once per version and filtered in memory.
+DATA_TTL = int(os.getenv("INSIGHTS_CACHE_TTL", "600"))  # seconds
+VERSION_TTL = int(os.getenv("INSIGHTS_VERSION_TTL", "60"))  # how often to check for new data
+PAGE_SIZE = int(os.getenv("INSIGHTS_PAGE_SIZE", "50"))  # rows per status table page
+ROLLUP_TTL = int(os.getenv("INSIGHTS_ROLLUP_TTL", "60"))  # how often to fold in new events
+
+
+@st.cache_resource
+def jobs_source():
+    return get_source()
+
+
+@st.cache_data(ttl=VERSION_TTL, show_spinner=False)
+def dataset_version(source_name: str) -> str:
+    return jobs_source().version()
+
+
+# cache_resource rather than cache_data: the frame is shared, not copied, on every
+# rerun, which matters at production size. Treat it as read-only.
+@st.cache_resource(ttl=DATA_TTL, max_entries=2, show_spinner="Loading jobs...")
+def load_jobs(source_name: str, version: str):
+    with metrics.stage("insights.load"):
+        return jobs_source().load_jobs()
+
+
+@st.cache_resource(ttl=DATA_TTL, max_entries=8)
+def filtered_jobs(source_name: str, version: str, filters: dict):
+    df = load_jobs(source_name, version)
+    with metrics.stage("insights.filter"):
+        return filter_jobs(df, filters)
+
+
+# one grouping pass per dataset version and filter set feeds both the scorecards and the tables
+@st.cache_resource(ttl=DATA_TTL, max_entries=8)
+def job_summary(source_name: str, version: str, filters: dict) -> dict:
+    if jobs_source().pushdown:
+        with metrics.stage("insights.summary"):
+            return jobs_source().summarise(filters)
+    df = filtered_jobs(source_name, version, filters)
+    with metrics.stage("insights.summary"):
+        return summarise_jobs(df)
+
+
+# in-memory sources: each status's rows, then their search/sort order as positions
+@st.cache_resource(ttl=DATA_TTL, max_entries=24)
+def status_rows(source_name: str, version: str, filters: dict, status: str, columns: tuple):
+    df = filtered_jobs(source_name, version, filters)
+    return status_table(df, job_summary(source_name, version, filters), status, list(columns))
+
+
+@st.cache_resource(ttl=DATA_TTL, max_entries=24)
+def table_order(source_name: str, version: str, filters: dict, status: str, columns: tuple,
+                search: str, sort: str, descending: bool):
+    rows = status_rows(source_name, version, filters, status, columns)
+    with metrics.stage("insights.sort"):
+        return order_jobs(rows, sort, descending, search)
+
+
+# only the visible page is serialised to the browser; each slice is cached
+@st.cache_data(ttl=DATA_TTL, max_entries=256, show_spinner=False)
+def table_page(source_name: str, version: str, filters: dict, status: str, columns: tuple,
+               search: str, sort: str, descending: bool, page: int) -> tuple:
+    offset = (page - 1) * PAGE_SIZE
+    if jobs_source().pushdown:
+        with metrics.stage("insights.page"):
+            return jobs_source().page(
+                list(columns), {**filters, "statuses": (status,), "title": search},
+                sort=sort, descending=descending, offset=offset, limit=PAGE_SIZE,
+            )
+    rows = status_rows(source_name, version, filters, status, columns)
+    order = table_order(source_name, version, filters, status, columns, search, sort, descending)
+    return rows.iloc[order[offset:offset + PAGE_SIZE]], len(order)
+
+
+@st.cache_data(ttl=DATA_TTL, show_spinner=False)
+def department_options(source_name: str, version: str) -> list:
+    if jobs_source().pushdown:
+        return jobs_source().departments()
+    return sorted(load_jobs(source_name, version)["department"].dropna().unique())
+
+
+# Rollups (rollups.py), when built: pre-aggregated views and status transitions,
+# keyed by their high-water marks. The page only reads them; events are folded in
+# by `python rollups.py refresh` (or whatever feeds the events), never on a rerun.
+@st.cache_resource
+def open_rollup_store():
+    return get_store()
+
+
+def rollup_store():
+    # a missing store isn't kept in the cache, so building it later
+    # (python rollups.py build-fixture) switches rollups on without a restart
+    store = open_rollup_store()
+    if store is None:
+        open_rollup_store.clear()
+    return store
+
 
-jobs_data = [
-    {"job_id": "CSJ-0001", "job_title": "Senior Product Manager", "status": "Advertised", "views": 234},
-    {"job_id": "CSJ-0002", "job_title": "Performance Analyst", "status": "Draft", "views": 0},
-    {"job_id": "CSJ-0003", "job_title": "Service Designer", "status": "Advertised", "views": 178},
-    {"job_id": "CSJ-0004", "job_title": "Interaction Designer", "status": "Closed", "views": 421},
-    {"job_id": "CSJ-0005", "job_title": "Delivery Manager", "status": "Draft", "views": 0},
-    {"job_id": "CSJ-0006", "job_title": "Technical Architect", "status": "Closed", "views": 355},
-    {"job_id": "CSJ-0007", "job_title": "Recruitment Lead", "status": "Advertised", "views": 292},
-]
+@st.cache_data(ttl=ROLLUP_TTL, show_spinner=False)
+def rollup_marks(source_name: str, version: str):
+    """The rollups' high-water marks, or None if they weren't built from this source version."""
+    store = rollup_store()
+    if store is None:
+        return None
+    with metrics.stage("insights.rollup_marks"):
+        if store.source() != (source_name, version):
+            return None
+        return tuple(store.high_water().values())
 
-df = pd.DataFrame(jobs_data)
+
+@st.cache_data(ttl=DATA_TTL, show_spinner=False)
+def rollup_scorecards(marks: tuple, departments: tuple) -> dict:
+    return rollup_store().scorecards(departments)
+
+
+@st.cache_data(ttl=DATA_TTL, show_spinner=False)
+def rollup_trends(marks: tuple, grain: str, departments: tuple) -> tuple:
+    store = rollup_store()
+    views = store.views_trend(grain, departments).pivot_table(
+        index="period", columns="department", values="views", aggfunc="sum", fill_value=0
+    )
+    transitions = store.transitions_trend(grain, departments).pivot_table(
+        index="period", columns="status", values="transitions", aggfunc="sum", fill_value=0
+    )
+    return views, transitions
+
+
+source = jobs_source()
+version = dataset_version(source.name)
+marks = rollup_marks(source.name, version)
+
+with st.sidebar:
+    st.subheader("Filters")
+    departments = st.multiselect("Department", department_options(source.name, version))
+    posted_from = st.date_input("Posted from", value=None)
+    posted_to = st.date_input("Posted to", value=None)
+filters = {"departments": tuple(departments), "start": posted_from, "end": posted_to}
+
+# the rollups are per department, so they can answer unless a posted-date filter is set
+if marks and not (posted_from or posted_to):
+    summary = rollup_scorecards(marks, filters["departments"])
+else:
+    summary = job_summary(source.name, version, filters)
 
 # quick counts
-draft_count = (df["status"] == "Draft").sum()
-advertised_count = (df["status"] == "Advertised").sum()
-closed_count = (df["status"] == "Closed").sum()
-total_count = len(df)
-published_views = df[df["status"].isin(["Advertised", "Closed"])]["views"].sum()
+draft_count = summary["counts"]["Draft"]
+advertised_count = summary["counts"]["Advertised"]
+closed_count = summary["counts"]["Closed"]
+total_count = summary["total"]
+published_views = summary["published_views"]
 
 # ----------------------------------
 # 2. Scorecards
@@ -45,30 +183,75 @@ col5.metric("Total advert views", published_views)
 st.markdown("---")
 
 # ----------------------------------
-# 3. Mini tables per status
+# 3. Mini tables per status (paginated, sorted and searched server-side)
 # ----------------------------------
+def paged_status_table(status: str, columns: tuple):
+    key = status.lower()
+
+    def back_to_first_page():
+        st.session_state[f"{key}_page"] = 1
+
+    st.subheader(status)
+    search = st.text_input(
+        "Search job titles", key=f"{key}_search", placeholder="Search job titles",
+        label_visibility="collapsed", on_change=back_to_first_page,
+    ).strip()
+    sort_col, order_col = st.columns([3, 1])
+    sort = sort_col.selectbox(
+        "Sort by", (None, *columns), key=f"{key}_sort", label_visibility="collapsed",
+        format_func=lambda c: "Unsorted" if c is None else f"Sort by {c}", on_change=back_to_first_page,
+    )
+    descending = order_col.toggle("Desc", key=f"{key}_desc", on_change=back_to_first_page)
+
+    page = st.session_state.get(f"{key}_page", 1)
+    rows, total = table_page(source.name, version, filters, status, columns, search, sort, descending, page)
+    pages = max(1, -(-total // PAGE_SIZE))
+    if page > pages:
+        # a new search or filter left us past the end
+        page = st.session_state[f"{key}_page"] = pages
+        rows, total = table_page(source.name, version, filters, status, columns, search, sort, descending, page)
+
+    st.dataframe(rows, use_container_width=True, hide_index=True)
+    if total:
+        first = (page - 1) * PAGE_SIZE + 1
+        st.caption(f"Rows {first:,}–{first + len(rows) - 1:,} of {total:,}")
+    else:
+        st.caption("No matching jobs")
+    if pages > 1:
+        st.number_input("Page", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+
+
 c1, c2, c3 = st.columns(3)
 
 with c1:
-    st.subheader("Draft")
-    st.dataframe(
-        df[df["status"] == "Draft"][["job_id", "job_title"]],
-        use_container_width=True,
-        hide_index=True
-    )
+    paged_status_table("Draft", ("job_id", "job_title"))
 
 with c2:
-    st.subheader("Advertised")
-    st.dataframe(
-        df[df["status"] == "Advertised"][["job_id", "job_title", "views"]],
-        use_container_width=True,
-        hide_index=True
-    )
+    paged_status_table("Advertised", ("job_id", "job_title", "views"))
 
 with c3:
-    st.subheader("Closed")
-    st.dataframe(
-        df[df["status"] == "Closed"][["job_id", "job_title", "views"]],
-        use_container_width=True,
-        hide_index=True
-    )
\ No newline at end of file
+    paged_status_table("Closed", ("job_id", "job_title", "views"))
+
+st.markdown("---")
+
+# ----------------------------------
+# 4. Trends (from the rollups)
+# ----------------------------------
+st.subheader("Trends")
+if not marks:
+    st.caption(
+        "No rollups for this data yet. Build them with `python rollups.py build-fixture`, "
+        "or feed events to rollups.RollupStore and run `python rollups.py refresh`."
+    )
+else:
+    grain = st.radio("Group by", ("day", "week"), index=1, horizontal=True, format_func=str.capitalize)
+    views_by_period, transitions_by_period = rollup_trends(marks, grain, filters["departments"])
+    t1, t2 = st.columns(2)
+    with t1:
+        st.markdown("**Advert views by department**")
+        st.line_chart(views_by_period)
+    with t2:
+        st.markdown("**Status changes**")
+        st.bar_chart(transitions_by_period)
+
+metrics.end_trace()
@@ -3,13 +3,37 @@ from password_gate import require_password
 require_password()
 import os
 import streamlit as st
-from openai import OpenAI
+
+import metrics
+from background import FAILED, collect_stream, executor, session_owner
+from interview_questions import (
+    INTERVIEW_VARIANTS,
+    cached_questions,
+    generate_variants,
+    question_items,
+    request_questions,
+    stream_questions,
+)
+from state_store import restore_draft, save_draft
 
 st.set_page_config(page_title="Recruitment hub - Interview question generator", page_icon="💬")
+metrics.start_trace("interview")
 
 # ----- SETUP -----
-# Expect your key in env var; you can change this to st.secrets if you prefer
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Expect your key in env var; the client is shared across pages and reruns and is only
+# built (and the OpenAI SDK imported) when the first question is generated.
+# Requests and the memo cache for repeat roles live in interview_questions.py
+
+# write questions into the chat token by token as they arrive
+STREAM_OUTPUT = os.getenv("STREAM_LLM_OUTPUT", "1") == "1"
+
+# generation runs on the background executor; a running job is checked this often
+POLL_SECONDS = float(os.getenv("BACKGROUND_POLL_SECONDS", "1"))
+
+# the conversation so far, saved outside this process (state_store.py)
+DRAFT_KEYS = (
+    "messages", "answers", "current_step", "generated_questions", "question_sets", "question_sets_round",
+)
 
 st.title("Interview question generator (mock)")
 st.info('We could extend the hub to include other AI capabilities like a interview question generator.', icon="ℹ️")
@@ -39,6 +63,8 @@ STRUCTURED_STEPS = [
     },
 ]
 
+restore_draft(st.session_state, st.query_params, "interview", DRAFT_KEYS)
+
 if "messages" not in st.session_state:
     # chat history shown to user
     st.session_state.messages = []
@@ -49,6 +75,15 @@ if "current_step" not in st.session_state:
     st.session_state.current_step = 0
 if "generated_questions" not in st.session_state:
     st.session_state.generated_questions = []
+if "question_sets" not in st.session_state:
+    # alternative sets drafted side by side (INTERVIEW_VARIANTS > 1); None for a set that failed
+    st.session_state.question_sets = []
+if "question_sets_round" not in st.session_state:
+    # bumped for every new batch of sets so old ticks don't carry over
+    st.session_state.question_sets_round = 0
+if "jobs" not in st.session_state:
+    # ids of this session's background generation jobs not yet added to the chat
+    st.session_state.jobs = []
 
 # helper to get next prompt
 def get_current_prompt():
@@ -57,6 +92,83 @@ def get_current_prompt():
         return STRUCTURED_STEPS[idx]["prompt"]
     return None
 
+def questions_job(answers: dict, refresh: bool = False):
+    """A job function drafting the question set(s); runs on a worker thread, so no Streamlit calls.
+
+    `refresh` asks for new questions rather than the ones memoised for these answers.
+    """
+    def run(job):
+        if INTERVIEW_VARIANTS > 1:
+            slots = [job.slot(v) for v in range(INTERVIEW_VARIANTS)] if STREAM_OUTPUT else None
+            return generate_variants(answers, INTERVIEW_VARIANTS, placeholders=slots, refresh=refresh)
+        if STREAM_OUTPUT:
+            return collect_stream(stream_questions(answers, refresh=refresh), job.slot(0))
+        return request_questions(answers, refresh=refresh)
+    return run
+
+
+def attach_finished_jobs():
+    """Add this session's finished generation jobs to the chat."""
+    owner = session_owner(st.session_state)
+    for job_id in list(st.session_state.jobs):
+        job = executor.get(job_id, owner)
+        if job is not None and not job.done:
+            continue
+        st.session_state.jobs.remove(job_id)
+        if job is None:
+            continue
+
+        if job.status == FAILED:
+            content = f"Sorry, I couldn't generate questions: {job.error}"
+            st.session_state.generated_questions = [content]
+        elif INTERVIEW_VARIANTS > 1:
+            sets, failed = job.result
+            if len(failed) == len(sets):
+                content = "Sorry, I couldn't generate questions. Please try again in a moment."
+                st.session_state.question_sets = []
+            else:
+                # the finished sets go to the picker below
+                content = (
+                    f"I've drafted {len(sets) - len(failed)} alternative sets below. "
+                    "Tick the questions you want from any set to build your own list."
+                )
+                if failed:
+                    content += " (" + ", ".join(f"Set {v + 1}" for v in failed) + " didn't finish.)"
+                st.session_state.question_sets = sets
+                st.session_state.question_sets_round += 1
+                st.session_state.generated_questions = next(s for s in sets if s is not None).split("\n")
+        else:
+            st.session_state.generated_questions = job.result.split("\n")
+            content = "Here are your interview questions:\n\n" + job.result
+            if job.meta["cached"]:
+                # same answers as an earlier run (e.g. another panel for the role): no call was made
+                content += "\n\n_Same answers as an earlier run, so these are the questions generated then._"
+            content += "\n\nYou can tweak them and ask me to regenerate."
+        st.session_state.messages.append({"role": "assistant", "content": content})
+
+
+@st.fragment(run_every=POLL_SECONDS)
+def question_monitor():
+    """The questions as they are written; reruns the page once they're done."""
+    owner = session_owner(st.session_state)
+    jobs = [executor.get(job_id, owner) for job_id in st.session_state.jobs]
+    if any(job is None or job.done for job in jobs):
+        st.rerun()
+    for job in jobs:
+        with st.chat_message("assistant"):
+            if INTERVIEW_VARIANTS > 1:
+                st.markdown(f"Drafting {INTERVIEW_VARIANTS} alternative sets of interview questions... ({job.elapsed():.0f}s)")
+                if STREAM_OUTPUT:
+                    for v, tab in enumerate(st.tabs([f"Set {v + 1}" for v in range(INTERVIEW_VARIANTS)])):
+                        tab.markdown(job.progress.get(v, ""))
+            else:
+                st.markdown(f"Generating tailored interview questions... ({job.elapsed():.0f}s)")
+                if STREAM_OUTPUT:
+                    st.markdown(job.progress.get(0, ""))
+
+
+attach_finished_jobs()
+
 # ----- DISPLAY HISTORY -----
 for msg in st.session_state.messages:
     with st.chat_message(msg["role"]):
@@ -93,57 +205,47 @@ if user_input:
         with st.chat_message("assistant"):
             st.markdown(next_prompt)
         st.session_state.messages.append({"role": "assistant", "content": next_prompt})
-    else:
-        # we have all answers -> generate interview questions
-        with st.chat_message("assistant"):
-            with st.spinner("Generating tailored interview questions..."):
-                role_title = st.session_state.answers.get("role_title", "the role")
-                grade_level = st.session_state.answers.get("grade_level", "")
-                core_capabilities = st.session_state.answers.get("core_capabilities", "")
-                experience_focus = st.session_state.answers.get("experience_focus", "")
-                role_context = st.session_state.answers.get("role_context", "")
-
-                prompt = f"""
-You are an experienced Civil Service / public sector interviewer.
-Generate 6-8 interview questions tailored to the following role.
-
-Role title: {role_title}
-Level/Grade: {grade_level}
-Core skills/behaviours to assess: {core_capabilities}
-Priority style (technical / situational / past behaviour): {experience_focus}
-Role context: {role_context}
-
-Rules:
-- Mix in competency/behavioural questions relevant to UK Civil Service context if appropriate.
-- Ask for evidence (STAR) where relevant.
-- Keep questions short and plain English.
-- Group them by ‘Core’, ‘Behavioural’, ‘Scenario’.
-                """.strip()
-
-                # ----- CALL LLM -----
-                try:
-                    resp = client.responses.create(
-                        model="gpt-4.1-mini",  # adjust to your model
-                        input=prompt,
-                    )
-                    ai_text = resp.output[0].content[0].text
-                    st.session_state.generated_questions = ai_text.split("\n")
-                except Exception as e:
-                    ai_text = f"Sorry, I couldn't generate questions: {e}"
-                    st.session_state.generated_questions = [ai_text]
-
-            # show result
-            st.markdown("Here are your interview questions:")
-            for line in st.session_state.generated_questions:
-                if line.strip():
-                    st.markdown(f"- {line.strip()}")
-
-            st.session_state.messages.append(
-                {
-                    "role": "assistant",
-                    "content": "I've generated some questions for you below. You can tweak them and ask me to regenerate."
-                }
-            )
+    elif not st.session_state.jobs:
+        # we have all answers -> generate interview questions in the background; the
+        # monitor below shows them arriving and they're added to the chat when done.
+        # A message after the last answer is a request to regenerate, so it skips the memo.
+        answers = dict(st.session_state.answers)
+        refresh = step_idx >= len(STRUCTURED_STEPS)
+        st.session_state.jobs.append(executor.submit(
+            session_owner(st.session_state), "questions", questions_job(answers, refresh),
+            meta={"cached": not refresh and cached_questions(answers) is not None},
+        ))
+
+# ----- RUNNING GENERATION -----
+if st.session_state.jobs:
+    question_monitor()
+
+# ----- PICK AND MIX -----
+if st.session_state.question_sets:
+    st.markdown("#### Pick your questions")
+    picked = []
+    tabs = st.tabs([f"Set {v + 1}" for v in range(len(st.session_state.question_sets))])
+    for v, (tab, text) in enumerate(zip(tabs, st.session_state.question_sets)):
+        with tab:
+            if text is None:
+                st.warning("This set didn't finish in time.")
+                continue
+            group = None
+            for n, (item_group, question) in enumerate(question_items(text)):
+                if item_group != group:
+                    group = item_group
+                    if group:
+                        st.markdown(f"**{group}**")
+                if st.checkbox(question, key=f"pick_{st.session_state.question_sets_round}_{v}_{n}"):
+                    picked.append(question)
+
+    if picked:
+        st.markdown("**Your selection**")
+        st.markdown("\n".join(f"{i}. {question}" for i, question in enumerate(picked, 1)))
+        st.download_button("Download selection", "\n".join(picked), file_name="interview_questions.txt")
+
+save_draft(st.session_state, st.query_params, "interview", DRAFT_KEYS)
+metrics.end_trace()
 
 # Sidebar intentionally left minimal; collected inputs removed to declutter UI
 
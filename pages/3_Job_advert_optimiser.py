@@ -1,58 +1,64 @@
 from password_gate import require_password
 require_password()
+import hashlib
 import json
 import os
 import re
-from io import BytesIO
 
 import streamlit as st
-from openai import OpenAI
-import requests
-from bs4 import BeautifulSoup
 
-# optional parsers
-try:
-    import docx  # python-docx
-except ImportError:
-    docx = None
-
-try:
-    from pypdf import PdfReader
-except ImportError:
-    PdfReader = None
+import metrics
+from advert_pipeline import (
+    CONTENT_FIELDS,
+    TARGET_SCHEMA,
+    ExtractionError,
+    extract_and_optimise,
+    extract_text_from_bytes,
+    get_missing_fields,
+    html_to_text,
+    normalise_url,
+    optimise_fields,
+    parse_cache,
+    structure_advert,
+)
+from background import FAILED, executor, session_owner
+from cache import llm_cache
+from llm_client import connection_stats
+from openai_gateway import gateway_stats
+from rule_extract import normalise_date
+from state_store import restore_draft, save_draft
 
 # --------------------------
 # CONFIG / CONSTANTS
 # --------------------------
 st.set_page_config(page_title="Recruitment hub - Job optimiser", page_icon="🧠")
+metrics.start_trace("optimiser")
 
-TARGET_SCHEMA = {
-    "job_title": "",
-    "department": "",
-    "location": "",
-    "salary": "",
-    "grade": "",
-    "closing_date": "",
-    "summary": "",
-    "responsibilities": "",
-    "essential_criteria": "",
-    "desirable_criteria": ""
-}
+# write AI suggestions into the page token by token as they arrive
+STREAM_OUTPUT = os.getenv("STREAM_LLM_OUTPUT", "1") == "1"
+
+# extract fields and draft content suggestions in a single LLM call
+COMBINED_PIPELINE = os.getenv("COMBINED_PIPELINE", "1") == "1"
 
-# content fields we want to optimise
-CONTENT_FIELDS = [
-    "summary",
-    "responsibilities",
-    "essential_criteria",
-    "desirable_criteria",
-]
+# LLM work runs on the background executor; running jobs are checked this often
+POLL_SECONDS = float(os.getenv("BACKGROUND_POLL_SECONDS", "1"))
+JOB_LABELS = {
+    "extract": "Extracting fields with OpenAI",
+    "optimise": "Optimising content with OpenAI",
+}
 
-# OpenAI client
-client = OpenAI()
+# the working draft, saved outside this process (state_store.py) so it survives a
+# restart or a request served by another web process
+DRAFT_KEYS = (
+    "schema", "pending_fields", "current_field", "extracted", "detected_source",
+    "optimised", "optimised_fingerprints",
+)
 
 # --------------------------
 # SESSION SETUP
 # --------------------------
+restore_draft(st.session_state, st.query_params, "optimiser", DRAFT_KEYS)
+
 if "schema" not in st.session_state:
     st.session_state["schema"] = TARGET_SCHEMA.copy()
 
@@ -72,6 +78,14 @@ if "optimised" not in st.session_state:
     # holds AI-suggested versions, e.g. {"summary": "...better text..."}
     st.session_state["optimised"] = {}
 
+if "optimised_fingerprints" not in st.session_state:
+    # fingerprint of the source text each suggestion in "optimised" was made from
+    st.session_state["optimised_fingerprints"] = {}
+
+if "jobs" not in st.session_state:
+    # ids of this session's background jobs that haven't been attached yet
+    st.session_state["jobs"] = []
+
 # NEW: Role setup
 if "user_role" not in st.session_state:
     st.session_state["user_role"] = "Non-Advertiser"
@@ -83,7 +97,6 @@ if "user_role" not in st.session_state:
 def extract_text_from_upload(uploaded_file):
     if uploaded_file is None:
         return ""
-    name = uploaded_file.name.lower()
 
     # read bytes once
     try:
@@ -94,72 +107,32 @@ def extract_text_from_upload(uploaded_file):
         except Exception:
             return ""
 
-    if name.endswith(".txt"):
-        try:
-            return data.decode("utf-8", errors="ignore")
-        except Exception:
-            return data.decode("latin-1", errors="ignore")
-
-    if name.endswith(".docx"):
-        if not docx:
-            st.error("DOCX support not installed. Add python-docx to requirements.")
-            return ""
-        try:
-            document = docx.Document(BytesIO(data))
-            return "\n".join(p.text for p in document.paragraphs)
-        except Exception as e:
-            st.error(f"Could not parse DOCX: {e}")
-            return ""
-
-    if name.endswith(".pdf"):
-        if not PdfReader:
-            st.error("PDF support not installed. Add pypdf to requirements.")
-            return ""
-        try:
-            reader = PdfReader(BytesIO(data))
-            return "\n".join((page.extract_text() or "") for page in reader.pages)
-        except Exception as e:
-            st.error(f"Could not parse PDF: {e}")
-            return ""
-
-    return ""
+    try:
+        return extract_text_from_bytes(uploaded_file.name, data)
+    except ExtractionError as e:
+        st.error(str(e))
+        return ""
 
 
 def extract_text_from_url(url: str, show_debug: bool = False) -> str:
     if not url:
         return ""
 
-    if not url.startswith(('http://', 'https://')):
-        url = 'https://' + url
+    url = normalise_url(url)
+    # requests is only loaded when a URL is actually fetched
+    import requests
+    from url_fetch import fetch_html
 
     try:
-        headers = {
-            'User-Agent': (
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
-                'AppleWebKit/537.36 (KHTML, like Gecko) '
-                'Chrome/91.0.4472.124 Safari/537.36'
-            )
-        }
-        res = requests.get(url, timeout=10, headers=headers, verify=True)
-        res.raise_for_status()
+        res = fetch_html(url)
 
         if show_debug:
-            st.write(f"Response status code: {res.status_code}")
-            st.write(f"Response content type: {res.headers.get('content-type', 'unknown')}")
+            st.write(f"Response status code: {res['status_code']}")
+            st.write(f"Response content type: {res['content_type'] or 'unknown'}")
+            if res["from_cache"]:
+                st.write("Page not modified; using cached copy")
 
-        soup = BeautifulSoup(res.text, "html.parser")
-
-        for elem in soup(["script", "style", "noscript", "header", "footer", "nav"]):
-            elem.decompose()
-
-        main_content = (
-            soup.find('main') or
-            soup.find('article') or
-            soup.find('div', class_='content') or
-            soup
-        )
-
-        text = main_content.get_text(separator="\n", strip=True)
+        text = html_to_text(res["html"])
 
         if not text:
             st.warning("No text was extracted from the page")
@@ -184,89 +157,121 @@ def extract_text_from_url(url: str, show_debug: bool = False) -> str:
         return ""
 
 
-def call_openai_structurer(raw_text: str, schema: dict, show_debug: bool = False) -> dict:
-    schema_str = json.dumps(schema, indent=2)
-    prompt = f"""
-You are an information extraction assistant for UK Civil Service job adverts.
-Extract as many fields as you can from the text below and return ONLY valid JSON matching this schema.
-If you don't know a field, leave it as an empty string.
-
-Schema:
-{schema_str}
-
-Text:
-\"\"\"{raw_text}\"\"\"
-"""
-    try:
-        resp = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You convert unstructured job adverts into structured JSON."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0
-        )
-        if show_debug:
-            st.write("OpenAI Response received successfully")
-    except Exception as e:
-        st.error(f"OpenAI API error: {e}")
-        return schema
-
-    raw_json = ""
-    try:
-        raw_json = resp.choices[0].message.content.strip()
-    except Exception:
-        try:
-            raw_json = str(resp.choices[0].message).strip()
-        except Exception:
-            raw_json = ""
-
-    if not raw_json:
+# --------------------------
+# BACKGROUND JOBS
+# --------------------------
+# The functions handed to the executor run on worker threads: no Streamlit calls in them.
+def extraction_job(raw_text: str) -> tuple:
+    """(extracted, suggestions) for the source text, falling back to extraction only."""
+    if COMBINED_PIPELINE:
         try:
-            raw_json = json.dumps(resp)
-        except Exception:
-            return schema
-
+            return extract_and_optimise(raw_text, TARGET_SCHEMA)
+        except ExtractionError:
+            pass  # combined response unusable; extract fields only
     try:
-        parsed = json.loads(raw_json)
-        return parsed
-    except Exception:
-        cleaned = raw_json.strip("` \n")
-        try:
-            return json.loads(cleaned)
-        except Exception:
-            return schema
-
-
-def get_missing_fields(current_schema: dict):
-    return [k for k, v in current_schema.items() if not v or not str(v).strip()]
-
-
-def optimise_single_field(field_name: str, text: str) -> str:
-    """Call OpenAI to optimise a single content field."""
-    prompt = f"""
-Rewrite the following {field_name.replace('_', ' ')} for a UK Civil Service style job advert.
-- keep the meaning
-- improve clarity and readability
-- user bullets for lists of more than three items
-- do NOT invent salary, grade, dates or department
-Return only the rewritten text.
-Text:
-{text}
-    """.strip()
+        return structure_advert(raw_text, TARGET_SCHEMA), {}
+    except ExtractionError:
+        return TARGET_SCHEMA.copy(), {}
+
+
+def optimisation_job(fields: dict):
+    """A job function optimising `fields`, streaming each rewrite into job.progress."""
+    def run(job):
+        placeholders = {cf: job.slot(cf) for cf in fields} if STREAM_OUTPUT else None
+        return optimise_fields(fields, placeholders=placeholders)
+    return run
+
+
+def start_job(kind: str, fn, replace: bool = False, **meta):
+    """Submit `fn(job)` for this session; `replace` drops its unfinished jobs of the same kind."""
+    owner = session_owner(st.session_state)
+    if replace:
+        for job_id in list(st.session_state["jobs"]):
+            job = executor.get(job_id, owner)
+            if job is None or job.kind == kind:
+                executor.cancel(job_id, owner)
+                st.session_state["jobs"].remove(job_id)
+    st.session_state["jobs"].append(executor.submit(owner, kind, fn, meta=meta))
+
+
+def apply_extraction(extracted: dict, suggestions: dict, detected_source: str):
+    st.session_state["schema"] = extracted.copy()
+    missing_fields = get_missing_fields(extracted)
+    st.session_state["pending_fields"] = missing_fields
+    st.session_state["current_field"] = None
+    st.session_state["extracted"] = True
+    st.session_state["detected_source"] = detected_source
+    st.session_state["optimised"] = {}
+    st.session_state["optimised_fingerprints"] = {}
+    store_suggestions(suggestions, extracted)
 
-    try:
-        resp = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You improve job-advert text."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3
-        )
-        return resp.choices[0].message.content.strip()
-    except Exception:
-        return text
+    if missing_fields:
+        st.toast("Extracted what I could. You can now optimise the content or fill in the rest.")
+    else:
+        st.toast("Successfully extracted all fields! ✅")
+
+
+def attach_finished_jobs():
+    """Apply this session's finished background jobs to its state."""
+    owner = session_owner(st.session_state)
+    for job_id in list(st.session_state["jobs"]):
+        job = executor.get(job_id, owner)
+        if job is not None and not job.done:
+            continue
+        st.session_state["jobs"].remove(job_id)
+        if job is None:
+            continue
+        if job.status == FAILED:
+            st.toast(f"OpenAI API error: {job.error}", icon="⚠️")
+        elif job.kind == "extract":
+            extracted, suggestions = job.result
+            apply_extraction(extracted, suggestions, job.meta["detected_source"])
+        elif job.kind == "optimise":
+            suggestions, failed = job.result
+            store_suggestions(suggestions, job.meta["source"])
+            if failed:
+                st.toast(f"Couldn't optimise: {', '.join(failed).replace('_', ' ')}", icon="⚠️")
+            elif suggestions:
+                st.toast("AI suggestions generated.")
+
+
+@st.fragment(run_every=POLL_SECONDS)
+def job_monitor():
+    """Progress of this session's running jobs; reruns the page once any has finished."""
+    owner = session_owner(st.session_state)
+    jobs = [executor.get(job_id, owner) for job_id in st.session_state["jobs"]]
+    if any(job is None or job.done for job in jobs):
+        st.rerun()
+    for job in jobs:
+        st.info(f"{JOB_LABELS[job.kind]}... ({job.elapsed():.0f}s)", icon="⏳")
+        if STREAM_OUTPUT:
+            for cf, text in job.progress.items():
+                with st.expander(f"AI suggestion: {cf.replace('_', ' ').title()}", expanded=True):
+                    st.markdown(text)
+
+
+def field_fingerprint(text: str) -> str:
+    return hashlib.sha256(str(text).strip().encode("utf-8")).hexdigest()
+
+
+def changed_content_fields(current_schema: dict) -> dict:
+    """Content fields with text that differs from what was last optimised."""
+    seen = st.session_state["optimised_fingerprints"]
+    return {
+        cf: current_schema[cf]
+        for cf in CONTENT_FIELDS
+        if current_schema.get(cf) and seen.get(cf) != field_fingerprint(current_schema[cf])
+    }
+
+
+def store_suggestions(suggestions: dict, source: dict):
+    """Keep AI suggestions and remember which text they were made from."""
+    st.session_state["optimised"].update(suggestions)
+    for cf in suggestions:
+        st.session_state["optimised_fingerprints"][cf] = field_fingerprint(source[cf])
+
+
+attach_finished_jobs()
 
 
 # --------------------------
@@ -280,10 +285,21 @@ st.write(
 )
 
 show_debug = st.toggle("Show debug info", value=False)
+if show_debug:
+    st.caption(f"LLM cache: {llm_cache.stats()}")
+    st.caption(f"Upload parse cache: {parse_cache.stats()}")
+    st.caption(f"OpenAI connections: {connection_stats()}")
+    st.caption(f"OpenAI gateway: {gateway_stats()}")
+    st.caption(f"Background jobs: {executor.stats()}")
+    st.caption(f"Trace: {metrics.current_trace()} (stage timings are on the Performance page)")
 
 if not os.getenv("OPENAI_API_KEY"):
     st.warning("OPENAI_API_KEY not found in environment — OpenAI calls will fail until you set it.")
 
+# running LLM work for this session; it carries on through reruns and navigation
+if st.session_state["jobs"]:
+    job_monitor()
+
 # NEW: Role selection
 st.session_state["user_role"] = st.radio(
     "Select your role:",
@@ -348,24 +364,12 @@ with tab1:
         if not source_text:
             st.warning("Please provide a source above first.")
         else:
-            with st.spinner("Extracting fields with OpenAI..."):
-                extracted = call_openai_structurer(source_text, TARGET_SCHEMA, show_debug=show_debug)
-
-            if isinstance(extracted, dict):
-                st.session_state["schema"] = extracted.copy()
-                missing_fields = get_missing_fields(extracted)
-                st.session_state["pending_fields"] = missing_fields
-                st.session_state["current_field"] = None
-                st.session_state["extracted"] = True
-                st.session_state["detected_source"] = detected_source
-                st.session_state["optimised"] = {}
-
-                if missing_fields:
-                    st.success("Extracted what I could. You can now optimise the content or fill in the rest.")
-                else:
-                    st.success("Successfully extracted all fields! ✅")
-            else:
-                st.error("Failed to extract structured data. Please try again.")
+            # a new extraction supersedes one still running
+            start_job(
+                "extract", lambda job: extraction_job(source_text), replace=True,
+                detected_source=detected_source,
+            )
+            st.rerun()
 
     if st.session_state.get("detected_source"):
         st.caption(f"Detected source: {st.session_state['detected_source']}")
@@ -386,12 +390,9 @@ with tab2:
         st.write("I can improve the longer text fields (summary, responsibilities, criteria).")
 
         if st.button("Optimise all existing content now"):
-            # go through schema and optimise any content fields that currently have text
-            for cf in CONTENT_FIELDS:
-                current_val = st.session_state["schema"].get(cf, "")
-                if current_val:
-                    st.session_state["optimised"][cf] = optimise_single_field(cf, current_val)
-            st.success("AI suggestions generated.")
+            # optimise any content fields that currently have text, all at once
+            fields = dict(st.session_state["schema"])
+            start_job("optimise", optimisation_job(fields), source=fields)
             st.rerun()
 
         optimised = st.session_state.get("optimised", {})
@@ -406,6 +407,8 @@ with tab2:
                     st.write(suggestion)
                     if st.button(f"Use AI version for {field}", key=f"use_ai_{field}"):
                         st.session_state["schema"][field] = suggestion
+                        # accepted text is already optimised; don't re-send it on save
+                        st.session_state["optimised_fingerprints"][field] = field_fingerprint(suggestion)
                         st.success(f"Updated {field} with AI version.")
                         # after accepting, recalc missing fields (in case it was empty before)
                         st.session_state["pending_fields"] = get_missing_fields(st.session_state["schema"])
@@ -454,16 +457,16 @@ with tab3:
             if st.button("Save this field"):
                 answer = user_input.strip()
 
-                # validate closing date
+                # validate closing date (accepting e.g. "7 November 2025" as well)
                 if field == "closing_date" and answer:
+                    answer = normalise_date(answer) or answer
                     if not re.match(r"^\d{4}-\d{2}-\d{2}$", answer):
                         st.warning("Please use format YYYY-MM-DD, e.g. 2025-11-07")
                     else:
                         st.session_state["schema"][field] = answer
                         # if optimisable, generate suggestion now
                         if field in CONTENT_FIELDS and answer:
-                            ai_version = optimise_single_field(field, answer)
-                            st.session_state["optimised"][field] = ai_version
+                            start_job("optimise", optimisation_job({field: answer}), source={field: answer})
                         st.session_state["pending_fields"] = [f for f in pending if f != field]
                         st.session_state["current_field"] = None
                         st.rerun()
@@ -471,8 +474,7 @@ with tab3:
                     st.session_state["schema"][field] = answer
                     # if optimisable, generate suggestion now
                     if field in CONTENT_FIELDS and answer:
-                        ai_version = optimise_single_field(field, answer)
-                        st.session_state["optimised"][field] = ai_version
+                        start_job("optimise", optimisation_job({field: answer}), source={field: answer})
                     st.session_state["pending_fields"] = [f for f in pending if f != field]
                     st.session_state["current_field"] = None
                     st.rerun()
@@ -514,11 +516,10 @@ with tab3:
 
             st.session_state["schema"] = updated_schema
 
-            # optimise any content fields that now have text
-            for cf in CONTENT_FIELDS:
-                val = updated_schema.get(cf, "")
-                if val:
-                    st.session_state["optimised"][cf] = optimise_single_field(cf, val)
+            # only re-optimise content fields whose text changed since their last suggestion
+            changed = changed_content_fields(updated_schema)
+            if changed:
+                start_job("optimise", optimisation_job(changed), source=changed)
 
             # recompute missing
             st.session_state["pending_fields"] = [
@@ -571,4 +572,8 @@ if is_advertiser:
                 st.markdown("### Mock Publishing Details")
                 st.write(f"**Job ID:** CSJ-MOCK-{abs(hash(json.dumps(schema))) % 100000}")
                 st.write(f"**Status:** Published on Civil Service Jobs")
-                st.caption("You can now return to the **Source** tab to start a new job.")
\ No newline at end of file
+                st.caption("You can now return to the **Source** tab to start a new job.")
+
+save_draft(st.session_state, st.query_params, "optimiser", DRAFT_KEYS)
+
+metrics.end_trace()
@@ -2,8 +2,10 @@ from password_gate import require_password
 require_password()
 import streamlit as st
 
+import metrics
 
 st.set_page_config(page_title="Recruitment hub - Developer documents", page_icon="🧩")
+metrics.start_trace("developer_docs")
 
 st.title("Developer documents (mock)")
 
@@ -80,3 +82,4 @@ st.info(
 	"If you share the exact OpenAPI spec URL I can add a small generated client and a smoke test to this repo (or embed an interactive Swagger/Redoc iframe on this page)."
 )
 
+metrics.end_trace()
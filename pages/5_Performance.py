@@ -0,0 +1,79 @@
+from password_gate import require_admin, require_password
+require_password()
+require_admin()
+import time
+
+import streamlit as st
+
+import metrics
+
+st.set_page_config(page_title="Recruitment hub - Performance", page_icon="⏱️", layout="wide")
+metrics.start_trace("performance")
+
+st.title("Performance (admin)")
+st.caption(
+    "Where the time goes in this web process since it started: stage timings, OpenAI token usage, "
+    "cache hit rates and recent traces. Each web process keeps its own figures."
+)
+
+if not metrics.METRICS_ENABLED:
+    st.warning("Instrumentation is switched off (METRICS_ENABLED=0).")
+    st.stop()
+
+if st.button("Refresh"):
+    st.rerun()
+
+# ----- STAGES -----
+st.header("Stage timings")
+stages = metrics.stage_summary()
+if stages:
+    st.dataframe(stages, hide_index=True, width="stretch")
+else:
+    st.info("Nothing recorded yet. Use the other pages and come back.")
+
+# ----- TOKENS -----
+st.header("OpenAI token usage")
+tokens = metrics.token_summary()
+if tokens:
+    st.dataframe(tokens, hide_index=True, width="stretch")
+    prompt = sum(row["prompt"] for row in tokens)
+    cached = sum(row["cached_prompt"] for row in tokens)
+    if prompt:
+        st.caption(f"Prompt tokens served from the provider's prompt cache: {cached / prompt:.0%}")
+else:
+    st.caption("No OpenAI calls yet.")
+
+# ----- CACHES -----
+st.header("Caches")
+st.dataframe(
+    [{**row, "hit_rate": f"{row['hit_rate']:.0%}"} for row in metrics.cache_summary()],
+    hide_index=True, width="stretch",
+)
+
+st.header("Gateway, connections and background work")
+st.json(metrics.gauge_values())
+
+# ----- TRACES -----
+st.header("Recent traces")
+st.caption("One trace per page run; background jobs and worker threads keep the trace of the run that started them.")
+traces = {}
+for span in metrics.recent_spans():
+    traces.setdefault(span["trace"] or "(none)", []).append(span)
+for trace_id, spans in list(traces.items())[-10:][::-1]:
+    started = time.strftime("%H:%M:%S", time.localtime(spans[0]["at"]))
+    with st.expander(f"{trace_id} · {started} · {len(spans)} spans"):
+        st.dataframe(
+            [{"stage": s["stage"], "ms": round(s["ms"], 1), "error": s["error"]} for s in spans],
+            hide_index=True, width="stretch",
+        )
+
+# ----- PROMETHEUS -----
+st.header("Prometheus text")
+text = metrics.prometheus_text()
+if metrics.METRICS_PORT:
+    st.caption(f"Also served at :{metrics.METRICS_PORT}/metrics for scraping.")
+st.download_button("Download metrics", text, file_name="metrics.txt")
+with st.expander("Show"):
+    st.code(text, language="text")
+
+metrics.end_trace()
@@ -17,4 +17,24 @@ def require_password():
                     st.rerun()
                 else:
                     st.error("Incorrect password")
-        st.stop() # stop rest of app until authenticated
\ No newline at end of file
+        st.stop() # stop rest of app until authenticated
+
+ADMIN_PW_HASH = os.getenv("ADMIN_PW_HASH", "")
+def require_admin():
+    # a second password for admin pages that show figures from every session;
+    # without ADMIN_PW_HASH those pages stay locked for everyone
+    if st.session_state.get("admin"):
+        return
+    st.title("■ Admin only")
+    if not ADMIN_PW_HASH:
+        st.info("This page is for admins. Set ADMIN_PW_HASH on the server to enable it.")
+        st.stop()
+    pw = st.text_input("Enter the admin password to continue", type="password", key="admin_pw")
+    if st.button("Unlock", key="admin_unlock"):
+        hashed = hashlib.sha256(pw.encode()).hexdigest()
+        if hmac.compare_digest(hashed, ADMIN_PW_HASH):
+            st.session_state.admin = True
+            st.rerun()
+        else:
+            st.error("Incorrect password")
+    st.stop() # stop rest of page until unlocked
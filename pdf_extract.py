@@ -0,0 +1,124 @@
+# pdf_extract.py
+# PDF text extraction for large candidate packs. Pages are extracted in batches across a
+# process pool and handed back in page order as soon as each batch is ready, so the
+# caller can stop early: at a page or character budget, once the advert itself has been
+# read, or when the per-file timeout runs out. pypdf is only imported once a PDF arrives.
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from io import BytesIO
+
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "40"))
+PDF_MAX_CHARS = int(os.getenv("PDF_MAX_CHARS", "200000"))
+PDF_TIMEOUT = float(os.getenv("PDF_TIMEOUT", "20"))  # seconds per file
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_BATCH_PAGES = int(os.getenv("PDF_BATCH_PAGES", "4"))
+
+# once all of these have been seen (plus one more page, in case the last section runs
+# over) the advert is in hand; what follows in a candidate pack is usually guidance,
+# policies and forms
+ADVERT_MARKERS = ("salary", "essential", "desirable", "closing date")
+
+_pool = None
+
+
+class PdfTimeout(TimeoutError):
+    """No text could be extracted before the per-file timeout."""
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    # one pool per process, started with spawn so it is safe inside Streamlit's threads
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def _reader(source):
+    from pypdf import PdfReader
+    return PdfReader(source)
+
+
+def _extract_page_range(path: str, start: int, stop: int) -> list:
+    reader = _reader(path)
+    return [(reader.pages[i].extract_text() or "") for i in range(start, stop)]
+
+
+def advert_found(text: str) -> bool:
+    lowered = text.lower()
+    return all(marker in lowered for marker in ADVERT_MARKERS)
+
+
+def iter_pdf_pages(data: bytes, max_pages: int = PDF_MAX_PAGES, timeout: float = PDF_TIMEOUT,
+                   status: dict = None):
+    """Yield (page_number, text) in page order, stopping at `max_pages` or the timeout.
+
+    Raises PdfTimeout if the deadline passes before the first page is ready. If
+    the timeout stops it later, status["timed_out"] is set (when `status` is given).
+    """
+    status = {} if status is None else status
+    deadline = time.monotonic() + timeout
+    reader = _reader(BytesIO(data))
+    page_count = min(len(reader.pages), max_pages)
+
+    # small files, or already inside a worker process (e.g. ingest.py): no pool
+    if page_count <= PDF_BATCH_PAGES or PDF_WORKERS <= 1 or multiprocessing.parent_process() is not None:
+        for i in range(page_count):
+            if time.monotonic() > deadline:
+                if i == 0:
+                    raise PdfTimeout("PDF extraction timed out")
+                status["timed_out"] = True
+                return
+            yield i, reader.pages[i].extract_text() or ""
+        return
+
+    # workers read the file from disk rather than having the bytes pickled per batch
+    tmp = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
+    try:
+        tmp.write(data)
+        tmp.close()
+        pool = _get_pool()
+        batches = [
+            (start, min(start + PDF_BATCH_PAGES, page_count))
+            for start in range(0, page_count, PDF_BATCH_PAGES)
+        ]
+        futures = [pool.submit(_extract_page_range, tmp.name, start, stop) for start, stop in batches]
+        try:
+            for (start, _), future in zip(batches, futures):
+                try:
+                    texts = future.result(timeout=max(0.0, deadline - time.monotonic()))
+                except FutureTimeoutError:
+                    if start == 0:
+                        raise PdfTimeout("PDF extraction timed out")
+                    status["timed_out"] = True
+                    return
+                for offset, text in enumerate(texts):
+                    yield start + offset, text
+        finally:
+            # the caller may stop early; don't leave queued batches behind
+            for future in futures:
+                future.cancel()
+    finally:
+        try:
+            os.unlink(tmp.name)
+        except OSError:
+            pass
+
+
+def extract_pdf_text(data: bytes, max_pages: int = PDF_MAX_PAGES, max_chars: int = PDF_MAX_CHARS,
+                     timeout: float = PDF_TIMEOUT, stop_when=advert_found, status: dict = None) -> str:
+    """Text of a PDF within the page/character budget, stopping once `stop_when(text)` is true.
+
+    status["timed_out"] is set if the timeout, not a budget or `stop_when`, cut the
+    text short; such text depends on machine load and shouldn't be cached.
+    """
+    parts, chars, found = [], 0, False
+    for _, text in iter_pdf_pages(data, max_pages=max_pages, timeout=timeout, status=status):
+        parts.append(text)
+        chars += len(text) + 1
+        if chars >= max_chars or found:
+            break
+        found = bool(stop_when and stop_when("\n".join(parts)))
+    return "\n".join(parts)[:max_chars]
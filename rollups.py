@@ -0,0 +1,388 @@
+# rollups.py
+# Pre-aggregated views and status-transition tables for the Data insights page.
+# Raw events are appended to two feeds (view_events, status_events). refresh() folds
+# only the events past each feed's high-water mark into:
+#   - views_by_period:       grain (day/week) x period x department -> views
+#   - transitions_by_period: grain x period x department x status -> jobs moving into it
+#   - status_totals:         department x status -> current jobs and their views
+# so the rollups are never rebuilt, and reading them costs the same however many
+# events there are. The store also records which jobs source and version the feeds
+# reflect, so the page only uses rollups that match the data it shows.
+#
+#   python rollups.py build-fixture   # seed the feeds from the configured jobs source
+#   python rollups.py refresh         # fold in new events, recorded against the source's version
+import argparse
+import os
+import random
+import sqlite3
+from collections import Counter
+from contextlib import closing
+from datetime import date, timedelta
+
+import pandas as pd
+
+from insights_data import DATA_DIR, PUBLISHED_STATUSES, STATUSES
+
+ROLLUP_DB_PATH = os.getenv("ROLLUP_DB_PATH", os.path.join(DATA_DIR, "rollups.sqlite3"))
+REFRESH_BATCH = int(os.getenv("ROLLUP_REFRESH_BATCH", "50000"))
+GRAINS = ("day", "week")
+FEEDS = ("view_events", "status_events")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS view_events (
+    event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL, department TEXT NOT NULL, day TEXT NOT NULL, views INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS status_events (
+    event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL, department TEXT NOT NULL, status TEXT NOT NULL, changed_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS high_water (feed TEXT PRIMARY KEY, event_id INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS job_state (
+    job_id TEXT PRIMARY KEY, department TEXT NOT NULL, status TEXT, views INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS views_by_period (
+    grain TEXT, period TEXT, department TEXT, views INTEGER NOT NULL,
+    PRIMARY KEY (grain, period, department)
+);
+CREATE TABLE IF NOT EXISTS transitions_by_period (
+    grain TEXT, period TEXT, department TEXT, status TEXT, transitions INTEGER NOT NULL,
+    PRIMARY KEY (grain, period, department, status)
+);
+CREATE TABLE IF NOT EXISTS status_totals (
+    department TEXT, status TEXT, jobs INTEGER NOT NULL, views INTEGER NOT NULL,
+    PRIMARY KEY (department, status)
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+def week_of(day: str) -> str:
+    """The Monday starting the ISO week of a YYYY-MM-DD day."""
+    d = date.fromisoformat(day[:10])
+    return (d - timedelta(days=d.weekday())).isoformat()
+
+
+class RollupStore:
+    """The event feeds and their rollups in one SQLite file."""
+
+    def __init__(self, path: str = ROLLUP_DB_PATH):
+        self.path = path
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.executescript(SCHEMA)
+        return conn
+
+    # ---- change feed ----
+    def record_views(self, rows):
+        """Append (job_id, department, day, views) events."""
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT INTO view_events (job_id, department, day, views) VALUES (?, ?, ?, ?)",
+                ((job_id, department or "", day, views) for job_id, department, day, views in rows),
+            )
+            conn.execute("COMMIT")
+
+    def record_status(self, rows):
+        """Append (job_id, department, status, changed_at) events."""
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT INTO status_events (job_id, department, status, changed_at) VALUES (?, ?, ?, ?)",
+                ((job_id, department or "", status, changed_at) for job_id, department, status, changed_at in rows),
+            )
+            conn.execute("COMMIT")
+
+    # ---- provenance ----
+    def set_source(self, name: str, version: str):
+        """Record the jobs source, and its dataset version, that the feeds reflect."""
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                (("source", name), ("source_version", version)),
+            )
+            conn.execute("COMMIT")
+
+    def source(self) -> tuple:
+        """(name, version) recorded by set_source(), or (None, None)."""
+        with closing(self._connect()) as conn:
+            meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+        return meta.get("source"), meta.get("source_version")
+
+    # ---- incremental refresh ----
+    def refresh(self, batch: int = REFRESH_BATCH) -> dict:
+        """Fold new events into the rollups; returns each feed's high-water mark.
+
+        Each batch and its high-water mark commit together, so an interrupted
+        refresh picks up where it stopped. Event ids are assigned under SQLite's
+        single writer lock, so committed events never appear below the mark.
+        """
+        with closing(self._connect()) as conn:
+            while self._refresh_views(conn, batch) == batch:
+                pass
+            while self._refresh_status(conn, batch) == batch:
+                pass
+            return self._marks(conn)
+
+    def high_water(self) -> dict:
+        with closing(self._connect()) as conn:
+            return self._marks(conn)
+
+    @staticmethod
+    def _marks(conn) -> dict:
+        marks = dict(conn.execute("SELECT feed, event_id FROM high_water").fetchall())
+        return {feed: marks.get(feed, 0) for feed in FEEDS}
+
+    @staticmethod
+    def _job_states(conn, job_ids) -> dict:
+        states = {}
+        job_ids = list(job_ids)
+        for start in range(0, len(job_ids), 500):
+            chunk = job_ids[start:start + 500]
+            rows = conn.execute(
+                f"SELECT job_id, department, status, views FROM job_state WHERE job_id IN ({','.join('?' * len(chunk))})",
+                chunk,
+            )
+            states.update((job_id, (department, status, views)) for job_id, department, status, views in rows)
+        return states
+
+    def _refresh_views(self, conn, batch: int) -> int:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            mark = self._marks(conn)["view_events"]
+            rows = conn.execute(
+                "SELECT event_id, job_id, department, day, views FROM view_events "
+                "WHERE event_id > ? ORDER BY event_id LIMIT ?",
+                (mark, batch),
+            ).fetchall()
+            if not rows:
+                conn.execute("COMMIT")
+                return 0
+
+            periods, by_job, departments = Counter(), Counter(), {}
+            for _, job_id, department, day, views in rows:
+                periods[("day", day[:10], department)] += views
+                periods[("week", week_of(day), department)] += views
+                by_job[job_id] += views
+                departments[job_id] = department
+
+            states = self._job_states(conn, by_job)
+            totals = Counter()
+            for job_id, views in by_job.items():
+                department, status, job_views = states.get(job_id, (departments[job_id], None, 0))
+                states[job_id] = (department, status, job_views + views)
+                if status:
+                    totals[(department, status)] += views
+
+            self._add_periods(conn, periods)
+            conn.executemany(
+                "INSERT OR REPLACE INTO job_state (job_id, department, status, views) VALUES (?, ?, ?, ?)",
+                ((job_id, *states[job_id]) for job_id in by_job),
+            )
+            self._add_totals(conn, Counter(), totals)
+            self._set_mark(conn, "view_events", rows[-1][0])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    def _refresh_status(self, conn, batch: int) -> int:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            mark = self._marks(conn)["status_events"]
+            rows = conn.execute(
+                "SELECT event_id, job_id, department, status, changed_at FROM status_events "
+                "WHERE event_id > ? ORDER BY event_id LIMIT ?",
+                (mark, batch),
+            ).fetchall()
+            if not rows:
+                conn.execute("COMMIT")
+                return 0
+
+            states = self._job_states(conn, {row[1] for row in rows})
+            transitions, jobs, views = Counter(), Counter(), Counter()
+            changed = set()
+            for _, job_id, department, status, changed_at in rows:
+                old_department, old_status, job_views = states.get(job_id, (department, None, 0))
+                if old_status == status:
+                    continue
+                if old_status:
+                    jobs[(old_department, old_status)] -= 1
+                    views[(old_department, old_status)] -= job_views
+                jobs[(department, status)] += 1
+                views[(department, status)] += job_views
+                states[job_id] = (department, status, job_views)
+                changed.add(job_id)
+                transitions[("day", changed_at[:10], department, status)] += 1
+                transitions[("week", week_of(changed_at), department, status)] += 1
+
+            conn.executemany(
+                "INSERT INTO transitions_by_period (grain, period, department, status, transitions) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT (grain, period, department, status) "
+                "DO UPDATE SET transitions = transitions + excluded.transitions",
+                ((*key, n) for key, n in transitions.items()),
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO job_state (job_id, department, status, views) VALUES (?, ?, ?, ?)",
+                ((job_id, *states[job_id]) for job_id in changed),
+            )
+            self._add_totals(conn, jobs, views)
+            self._set_mark(conn, "status_events", rows[-1][0])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    @staticmethod
+    def _add_periods(conn, periods: Counter):
+        conn.executemany(
+            "INSERT INTO views_by_period (grain, period, department, views) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (grain, period, department) DO UPDATE SET views = views + excluded.views",
+            ((*key, n) for key, n in periods.items()),
+        )
+
+    @staticmethod
+    def _add_totals(conn, jobs: Counter, views: Counter):
+        conn.executemany(
+            "INSERT INTO status_totals (department, status, jobs, views) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (department, status) DO UPDATE SET jobs = jobs + excluded.jobs, views = views + excluded.views",
+            ((department, status, jobs[(department, status)], views[(department, status)])
+             for department, status in set(jobs) | set(views)),
+        )
+
+    @staticmethod
+    def _set_mark(conn, feed: str, event_id: int):
+        conn.execute("INSERT OR REPLACE INTO high_water (feed, event_id) VALUES (?, ?)", (feed, event_id))
+
+    # ---- reads (rollup tables only) ----
+    @staticmethod
+    def _department_clause(departments) -> tuple:
+        if not departments:
+            return "", []
+        return f" AND department IN ({','.join('?' * len(departments))})", list(departments)
+
+    def scorecards(self, departments=()) -> dict:
+        """The same shape as insights_data.summarise_jobs() (without "rows")."""
+        where, params = self._department_clause(departments)
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT status, SUM(jobs), SUM(views) FROM status_totals WHERE 1 = 1{where} GROUP BY status",
+                params,
+            ).fetchall()
+        counts = dict.fromkeys(STATUSES, 0)
+        views = dict.fromkeys(STATUSES, 0)
+        for status, n, total in rows:
+            if status in counts:
+                counts[status], views[status] = int(n), int(total)
+        return {
+            "counts": counts,
+            "views": views,
+            "total": sum(counts.values()),
+            "published_views": sum(views[s] for s in PUBLISHED_STATUSES),
+        }
+
+    def views_trend(self, grain: str = "day", departments=()) -> pd.DataFrame:
+        """Columns period, department, views."""
+        where, params = self._department_clause(departments)
+        with closing(self._connect()) as conn:
+            return pd.read_sql_query(
+                f"SELECT period, department, views FROM views_by_period WHERE grain = ?{where} ORDER BY period",
+                conn, params=[grain, *params],
+            )
+
+    def transitions_trend(self, grain: str = "day", departments=()) -> pd.DataFrame:
+        """Columns period, status, transitions (summed over the departments)."""
+        where, params = self._department_clause(departments)
+        with closing(self._connect()) as conn:
+            return pd.read_sql_query(
+                f"SELECT period, status, SUM(transitions) AS transitions FROM transitions_by_period "
+                f"WHERE grain = ?{where} GROUP BY period, status ORDER BY period",
+                conn, params=[grain, *params],
+            )
+
+
+def get_store():
+    """The rollup store at ROLLUP_DB_PATH, or None if it hasn't been created."""
+    return RollupStore(ROLLUP_DB_PATH) if os.path.exists(ROLLUP_DB_PATH) else None
+
+
+# --------------------------
+# LOCAL FIXTURE
+# --------------------------
+def build_fixture(store: RollupStore, jobs: pd.DataFrame, seed: int = 42, batch: int = 50_000):
+    """Seed the feeds with events that end in each job's current status and views.
+
+    Every job is drafted on its posted date; advertised and closed jobs are
+    advertised a few days later, closed jobs close weeks after that, and their
+    views are spread over a handful of days in between.
+    """
+    rng = random.Random(seed)
+    status_rows, view_rows = [], []
+
+    def flush(force=False):
+        if force or len(status_rows) >= batch:
+            store.record_status(status_rows)
+            status_rows.clear()
+        if force or len(view_rows) >= batch:
+            store.record_views(view_rows)
+            view_rows.clear()
+
+    for job_id, status, views, department, posted in zip(
+        jobs["job_id"], jobs["status"].astype(str), jobs["views"], jobs["department"], jobs["posted_date"]
+    ):
+        posted = date.fromisoformat(str(posted)[:10])
+        status_rows.append((job_id, department, "Draft", posted.isoformat()))
+        if status == "Draft":
+            flush()
+            continue
+        advertised = posted + timedelta(days=rng.randint(1, 3))
+        status_rows.append((job_id, department, "Advertised", advertised.isoformat()))
+        closes = advertised + timedelta(days=rng.randint(14, 42))
+        if status == "Closed":
+            status_rows.append((job_id, department, "Closed", closes.isoformat()))
+        remaining = int(views or 0)
+        days = sorted(rng.sample(range((closes - advertised).days), min(5, (closes - advertised).days)))
+        for n, offset in enumerate(days):
+            share = remaining if n == len(days) - 1 else rng.randint(0, remaining)
+            remaining -= share
+            if share:
+                view_rows.append((job_id, department, (advertised + timedelta(days=offset)).isoformat(), share))
+        flush()
+    flush(force=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Data insights rollups.")
+    parser.add_argument("--path", default=ROLLUP_DB_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    fixture = sub.add_parser("build-fixture", help="replace the feeds with events derived from JOBS_SOURCE")
+    fixture.add_argument("--seed", type=int, default=42)
+    sub.add_parser("refresh", help="fold new events into the rollups")
+    args = parser.parse_args(argv)
+
+    from insights_data import get_source
+    source = get_source()
+    # read before the jobs: data changing meanwhile then shows as stale, not current
+    version = source.version()
+    if args.command == "build-fixture":
+        if os.path.exists(args.path):
+            os.remove(args.path)
+        store = RollupStore(args.path)
+        jobs = source.load_jobs()
+        build_fixture(store, jobs, seed=args.seed)
+        print(f"Wrote events for {len(jobs)} jobs to {args.path}")
+    store = RollupStore(args.path)
+    marks = store.refresh()
+    store.set_source(source.name, version)
+    print("High-water marks: " + ", ".join(f"{feed}={mark}" for feed, mark in marks.items()))
+    print(f"Recorded as {source.name} version {version}")
+
+
+if __name__ == "__main__":
+    main()
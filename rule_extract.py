@@ -0,0 +1,203 @@
+# rule_extract.py
+# Deterministic extraction of the predictable fields in Civil Service job adverts
+# (labelled lines, salary ranges, closing dates, grades, departments and headed
+# sections). It runs before the LLM so the prompt only has to ask for what is left.
+import re
+from datetime import datetime
+
+GRADES = [
+    "Administrative Assistant", "Administrative Officer", "Executive Officer",
+    "Higher Executive Officer", "Senior Executive Officer",
+    "Grade 7", "Grade 6", "SCS Pay Band 1", "SCS Pay Band 2", "SCS Pay Band 3",
+    "AA", "AO", "EO", "HEO", "SEO", "G7", "G6", "SCS1", "SCS2", "SCS3",
+]
+
+AMBIGUOUS_GRADES = {"AA", "AO", "EO"}
+
+DEPARTMENTS = [
+    "Cabinet Office", "HM Treasury", "Home Office", "Ministry of Justice", "Ministry of Defence",
+    "HM Revenue and Customs", "HM Revenue & Customs", "HMRC",
+    "Department for Work and Pensions", "Department for Education", "Department for Transport",
+    "Department of Health and Social Care", "Department for Business and Trade",
+    "Department for Science, Innovation and Technology", "Department for Energy Security and Net Zero",
+    "Department for Environment, Food and Rural Affairs", "Department for Environment, Food & Rural Affairs",
+    "Department for Culture, Media and Sport", "Foreign, Commonwealth and Development Office",
+    "Foreign, Commonwealth & Development Office", "Ministry of Housing, Communities and Local Government",
+    "Government Digital Service", "Government Property Agency", "Crown Prosecution Service",
+    "Office for National Statistics", "HM Land Registry", "Companies House", "DVLA", "DVSA",
+]
+
+# label text (lower case) -> schema field, for "Label: value" lines
+INLINE_LABELS = {
+    "job title": "job_title",
+    "department": "department",
+    "organisation": "department",
+    "location": "location",
+    "locations": "location",
+    "salary": "salary",
+    "grade": "grade",
+    "closing date": "closing_date",
+    "closes": "closing_date",
+}
+
+# heading text (lower case) -> schema field, for headed multi-line sections
+SECTION_HEADINGS = {
+    "summary": "summary",
+    "job summary": "summary",
+    "about the job": "summary",
+    "about the role": "summary",
+    "responsibilities": "responsibilities",
+    "key responsibilities": "responsibilities",
+    "job description": "responsibilities",
+    "what you'll do": "responsibilities",
+    "essential criteria": "essential_criteria",
+    "essential skills": "essential_criteria",
+    "essential": "essential_criteria",
+    "person specification": "essential_criteria",
+    "desirable criteria": "desirable_criteria",
+    "desirable skills": "desirable_criteria",
+    "desirable": "desirable_criteria",
+}
+
+# headings that end a section without starting one we want
+STOP_HEADINGS = {
+    "benefits", "things you need to know", "how to apply", "selection process",
+    "selection process details", "behaviours", "technical skills", "about us",
+    "contact point for applicants", "further information", "security", "nationality requirements",
+}
+
+SALARY = re.compile(
+    r"£\s?\d{1,3}(?:,\d{3})+(?:\.\d{2})?(?:\s*(?:-|–|—|to)\s*£\s?\d{1,3}(?:,\d{3})+(?:\.\d{2})?)?"
+)
+LABELLED_LINE = re.compile(r"^\s*([A-Za-z' ]{2,30})\s*[:\-–]\s*(.+?)\s*$")
+HEADING_LINE = re.compile(r"^\s*([A-Za-z' ]{2,40}?)\s*:?\s*$")
+GRADE = re.compile(
+    r"\b(" + "|".join(re.escape(g) for g in sorted(GRADES, key=len, reverse=True)) + r")\b"
+    r"(?:\s*/\s*\b(" + "|".join(re.escape(g) for g in sorted(GRADES, key=len, reverse=True)) + r")\b)?"
+)
+DEPARTMENT = re.compile(
+    r"\b(" + "|".join(re.escape(d) for d in sorted(DEPARTMENTS, key=len, reverse=True)) + r")\b"
+)
+# "Salary: £32,000 national, £36,500 London. Plus a pension..." keeps its first sentence
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z])")
+MAX_SALARY_CHARS = 120
+# a labelled title longer than this, or ending like a sentence, is prose, not a title
+MAX_TITLE_WORDS = 12
+MAX_TITLE_CHARS = 100
+ORDINAL = re.compile(r"(\d{1,2})(st|nd|rd|th)\b", re.IGNORECASE)
+WEEKDAY = re.compile(r"^(monday|tuesday|wednesday|thursday|friday|saturday|sunday),?\s+", re.IGNORECASE)
+DATE_FORMATS = ("%Y-%m-%d", "%d %B %Y", "%d %b %Y", "%B %d %Y", "%d/%m/%Y", "%d/%m/%y", "%d.%m.%Y")
+
+
+def normalise_date(value: str) -> str:
+    """YYYY-MM-DD for the date at the start of `value`, or "" if it can't be read."""
+    text = WEEKDAY.sub("", value.strip())
+    text = ORDINAL.sub(r"\1", text).replace(",", " ")
+    text = re.sub(r"\s+", " ", text).strip()
+    # try progressively shorter prefixes so trailing times ("11:55pm") are ignored
+    words = text.split(" ")
+    for n in range(min(len(words), 3), 0, -1):
+        candidate = " ".join(words[:n])
+        for fmt in DATE_FORMATS:
+            try:
+                return datetime.strptime(candidate, fmt).strftime("%Y-%m-%d")
+            except ValueError:
+                continue
+    return ""
+
+
+def _clean_value(field: str, value: str) -> str:
+    if field == "closing_date":
+        return normalise_date(value)
+    if field == "job_title":
+        if len(value) > MAX_TITLE_CHARS or len(value.split()) > MAX_TITLE_WORDS or value[-1] in ".!?;:":
+            return ""  # left for the model
+        return value
+    if field == "salary":
+        match = SALARY.search(value)
+        if not match:
+            return value
+        # keep qualifiers such as "national", "London" or "per annum", but not the
+        # benefits text that often follows in the same line
+        kept = SENTENCE_END.split(value, 1)[0].strip().rstrip(".")
+        return kept if SALARY.search(kept) and len(kept) <= MAX_SALARY_CHARS else match.group(0)
+    if field == "grade":
+        match = GRADE.search(value)
+        return match.group(0) if match else value
+    return value
+
+
+def pre_extract(text: str) -> dict:
+    """Fields that can be read from the advert without an LLM. Only found fields are returned."""
+    found = {}
+    sections = {}
+    current = None
+    awaiting = None  # inline label seen on its own line; its value is the next line
+
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+
+        if awaiting:
+            value = _clean_value(awaiting, stripped)
+            if value and awaiting not in found:
+                found[awaiting] = value
+            awaiting = None
+            continue
+
+        heading = HEADING_LINE.match(stripped)
+        if heading:
+            label = heading.group(1).strip().lower()
+            if label in SECTION_HEADINGS:
+                current = SECTION_HEADINGS[label]
+                sections.setdefault(current, [])
+                continue
+            if label in INLINE_LABELS:
+                awaiting = INLINE_LABELS[label]
+                current = None
+                continue
+            if label in STOP_HEADINGS:
+                current = None
+                continue
+
+        labelled = LABELLED_LINE.match(stripped)
+        if labelled:
+            label = labelled.group(1).strip().lower()
+            if label in INLINE_LABELS:
+                field = INLINE_LABELS[label]
+                value = _clean_value(field, labelled.group(2))
+                if value and field not in found:
+                    found[field] = value
+                current = None
+                continue
+            if label in SECTION_HEADINGS:
+                # "Summary: first sentence..." starts a section with inline text
+                current = SECTION_HEADINGS[label]
+                sections.setdefault(current, []).append(labelled.group(2))
+                continue
+
+        if current:
+            sections[current].append(stripped)
+
+    for field, lines in sections.items():
+        if lines and field not in found:
+            found[field] = "\n".join(lines)
+
+    # unlabelled fallbacks for the pattern-shaped fields
+    if "salary" not in found:
+        match = SALARY.search(text)
+        if match:
+            found["salary"] = match.group(0)
+    if "grade" not in found:
+        # short codes like "EO" or "AA" are too ambiguous without a "Grade" label
+        for match in GRADE.finditer(text):
+            if match.group(1) not in AMBIGUOUS_GRADES:
+                found["grade"] = match.group(0)
+                break
+    if "department" not in found:
+        match = DEPARTMENT.search(text)
+        if match:
+            found["department"] = match.group(1)
+
+    return found
@@ -0,0 +1,254 @@
+# state_store.py
+# Working drafts (the advert being optimised, the interview chat) kept outside the web
+# process, so a session can carry on from another web process behind a load balancer,
+# or after a restart, instead of living only in one process's st.session_state.
+#
+# A draft is stored under "<draft id>:<page>". The draft id is kept in session state
+# and mirrored into the page URL (?draft=...), so a reload or a request served by
+# another process finds the same draft. Values are compact JSON, zlib-compressed
+# when large.
+#
+# Saves are write-behind: save() only queues the snapshot, and a background thread
+# writes everything queued every STATE_FLUSH_SECONDS in one batch, so a rerun never
+# waits on storage. Unchanged snapshots are not written again. A process that stops
+# may lose at most the last flush interval.
+#
+# Backends: "sqlite" (a file; the default), "redis" (anything speaking the Redis
+# protocol, at STATE_REDIS_URL; needs the `redis` package) or "none".
+# Like background.py, nothing in here touches Streamlit.
+import atexit
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+
+import metrics
+from cache import CACHE_DIR
+
+STATE_BACKEND = os.getenv("STATE_BACKEND", "sqlite")
+STATE_DB_PATH = os.getenv("STATE_DB_PATH", os.path.join(CACHE_DIR, "state.sqlite3"))
+STATE_REDIS_URL = os.getenv("STATE_REDIS_URL", os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+STATE_TTL = float(os.getenv("STATE_TTL", str(7 * 24 * 3600)))  # seconds a draft is kept after its last save
+STATE_FLUSH_SECONDS = float(os.getenv("STATE_FLUSH_SECONDS", "0.5"))
+
+COMPRESS_OVER = 512  # bytes; smaller payloads aren't worth compressing
+TRACKED_DRAFTS = 4096  # drafts whose last snapshot is remembered, to skip unchanged saves
+DRAFT_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+# --------------------------
+# SERIALISATION
+# --------------------------
+def encode(value) -> bytes:
+    payload = json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+    if len(payload) > COMPRESS_OVER:
+        return b"z" + zlib.compress(payload)
+    return b"j" + payload
+
+
+def decode(blob: bytes):
+    if blob[:1] == b"z":
+        return json.loads(zlib.decompress(blob[1:]))
+    return json.loads(blob[1:])
+
+
+# --------------------------
+# BACKENDS
+# --------------------------
+class SQLiteStateBackend:
+    """Drafts in a SQLite file, shared by every process that can reach it."""
+
+    def __init__(self, path: str = STATE_DB_PATH, ttl: float = STATE_TTL):
+        self.path = path
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS drafts (key TEXT PRIMARY KEY, value BLOB, updated REAL)")
+        self._db.commit()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM drafts WHERE key = ? AND updated > ?", (key, time.time() - self.ttl)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_many(self, items: dict):
+        now = time.time()
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO drafts (key, value, updated) VALUES (?, ?, ?)",
+                [(key, blob, now) for key, blob in items.items()],
+            )
+            self._db.execute("DELETE FROM drafts WHERE updated <= ?", (now - self.ttl,))
+
+    def delete(self, key: str):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM drafts WHERE key = ?", (key,))
+
+
+class RedisStateBackend:
+    """Drafts in Redis (or anything that speaks its protocol), expiring after `ttl`."""
+
+    def __init__(self, url: str = STATE_REDIS_URL, ttl: float = STATE_TTL):
+        import redis  # only needed when this backend is chosen
+
+        self.ttl = int(ttl)
+        self._redis = redis.Redis.from_url(url)
+
+    def get(self, key: str):
+        return self._redis.get(f"draft:{key}")
+
+    def set_many(self, items: dict):
+        pipe = self._redis.pipeline(transaction=False)
+        for key, blob in items.items():
+            pipe.set(f"draft:{key}", blob, ex=self.ttl)
+        pipe.execute()
+
+    def delete(self, key: str):
+        self._redis.delete(f"draft:{key}")
+
+
+# --------------------------
+# WRITE-BEHIND STORE
+# --------------------------
+class DraftStore:
+    """Queues draft snapshots and writes them to `backend` in batches from a background thread."""
+
+    def __init__(self, backend, flush_seconds: float = STATE_FLUSH_SECONDS):
+        self.backend = backend
+        self.flush_seconds = flush_seconds
+        self._pending = {}
+        self._flushing = {}  # the batch being written right now
+        self._written = OrderedDict()  # key -> digest of the last snapshot queued
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.stats = {"saves": 0, "skipped": 0, "flushes": 0, "written": 0, "errors": 0}
+        threading.Thread(target=self._run, name="state-store", daemon=True).start()
+        atexit.register(self.flush)
+
+    def load(self, key: str):
+        """The latest snapshot for `key` (including one not flushed yet), or None."""
+        with self._lock:
+            blob = self._pending.get(key, self._flushing.get(key))
+        if blob is None:
+            try:
+                blob = self.backend.get(key)
+            except Exception:
+                self.stats["errors"] += 1
+                return None
+        return decode(blob) if blob is not None else None
+
+    def save(self, key: str, value):
+        """Queue a snapshot; returns straight away."""
+        blob = encode(value)
+        digest = hashlib.blake2b(blob, digest_size=16).digest()
+        with self._lock:
+            if self._written.get(key) == digest:
+                self.stats["skipped"] += 1
+                return
+            self._written[key] = digest
+            self._written.move_to_end(key)
+            if len(self._written) > TRACKED_DRAFTS:
+                self._written.popitem(last=False)
+            self._pending[key] = blob
+            self.stats["saves"] += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._pending.pop(key, None)
+            self._written.pop(key, None)
+        self.backend.delete(key)
+
+    def flush(self):
+        """Write everything queued so far in one batch."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._flushing = batch
+            if not batch:
+                return
+            try:
+                with metrics.stage("state.flush"):
+                    self.backend.set_many(batch)
+            except Exception:
+                # keep the batch for the next flush, unless newer snapshots replaced it
+                with self._lock:
+                    self._pending = {**batch, **self._pending}
+                self.stats["errors"] += 1
+                return
+            finally:
+                with self._lock:
+                    self._flushing = {}
+            self.stats["flushes"] += 1
+            self.stats["written"] += len(batch)
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            self.flush()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """The process-wide draft store for STATE_BACKEND, or None when it is "none"."""
+    global _store
+    if _store is None and STATE_BACKEND != "none":
+        with _store_lock:
+            if _store is None:
+                backend = RedisStateBackend() if STATE_BACKEND == "redis" else SQLiteStateBackend()
+                _store = DraftStore(backend)
+                metrics.register_gauges("draft_store", lambda: dict(_store.stats))
+    return _store
+
+
+# --------------------------
+# SESSION GLUE
+# --------------------------
+def draft_id(state, params) -> str:
+    """This session's draft id: from session state, else the URL, else a new one. Kept in both."""
+    draft = state.get("draft_id")
+    if draft is None:
+        draft = params.get("draft")
+        if not (isinstance(draft, str) and DRAFT_ID.match(draft)):
+            draft = uuid.uuid4().hex
+        state["draft_id"] = draft
+    if params.get("draft") != draft:
+        # page navigation drops query params, so put it back on every run
+        params["draft"] = draft
+    return draft
+
+
+def restore_draft(state, params, page: str, keys: tuple):
+    """Load the page's saved draft into session state, once per session.
+
+    Call before the page sets its defaults, so restored values win.
+    """
+    store = get_store()
+    flag = f"draft_restored_{page}"
+    if store is None or state.get(flag):
+        return
+    state[flag] = True
+    saved = store.load(f"{draft_id(state, params)}:{page}") or {}
+    for key in keys:
+        if key in saved:
+            state[key] = saved[key]
+
+
+def save_draft(state, params, page: str, keys: tuple):
+    """Queue the page's draft (the `keys` present in session state) for writing."""
+    store = get_store()
+    if store is None:
+        return
+    store.save(f"{draft_id(state, params)}:{page}", {key: state[key] for key in keys if key in state})
@@ -0,0 +1,131 @@
+# url_fetch.py
+# Fetch layer for job advert URLs: one pooled requests.Session per process, an on-disk
+# cache revalidated with conditional GETs (ETag / Last-Modified), a hard cap on the
+# download size and an early abort for anything that isn't an HTML page.
+import codecs
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+from cache import TieredCache, make_key
+
+USER_AGENT = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
+    'AppleWebKit/537.36 (KHTML, like Gecko) '
+    'Chrome/91.0.4472.124 Safari/537.36'
+)
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "10"))  # seconds
+FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", str(5 * 1024 * 1024)))
+FETCH_POOL_SIZE = int(os.getenv("FETCH_POOL_SIZE", "10"))
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+CHUNK_SIZE = 64 * 1024
+
+# cached pages are always revalidated, the TTL only bounds how long validators are kept
+http_cache = TieredCache(
+    "http",
+    max_items=int(os.getenv("HTTP_CACHE_ITEMS", "128")),
+    ttl=float(os.getenv("HTTP_CACHE_TTL", str(7 * 24 * 3600))),
+    max_disk_bytes=int(os.getenv("HTTP_CACHE_MAX_BYTES", str(100 * 1024 * 1024))),
+)
+
+_session = None
+_lock = threading.Lock()
+
+
+class ResponseTooLarge(requests.exceptions.RequestException):
+    """The response body is bigger than FETCH_MAX_BYTES."""
+
+
+class UnsupportedContentType(requests.exceptions.RequestException):
+    """The URL doesn't point at an HTML page."""
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=FETCH_POOL_SIZE, pool_maxsize=FETCH_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers["User-Agent"] = USER_AGENT
+                _session = session
+    return _session
+
+
+def _read_capped(res: requests.Response, max_bytes: int) -> bytes:
+    declared = res.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        raise ResponseTooLarge(f"Page is {int(declared)} bytes; the limit is {max_bytes}")
+    body = bytearray()
+    for chunk in res.iter_content(CHUNK_SIZE):
+        body.extend(chunk)
+        if len(body) > max_bytes:
+            raise ResponseTooLarge(f"Page is larger than the {max_bytes} byte limit")
+    return bytes(body)
+
+
+def _charset(res: requests.Response, content_type: str) -> str:
+    # the declared charset if Python knows it; servers do send made-up names
+    encoding = res.encoding if "charset" in content_type.lower() else None
+    try:
+        return codecs.lookup(encoding).name if encoding else "utf-8"
+    except LookupError:
+        return "utf-8"
+
+
+@metrics.timed("url.fetch")
+def fetch_html(url: str, timeout: float = FETCH_TIMEOUT, max_bytes: int = FETCH_MAX_BYTES) -> dict:
+    """GET an HTML page, revalidating any cached copy.
+
+    Returns {"html", "status_code", "content_type", "from_cache"}. Raises a
+    requests RequestException (including ResponseTooLarge / UnsupportedContentType)
+    on failure.
+    """
+    key = make_key("http", url)
+    cached = http_cache.get(key)
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    with get_session().get(url, timeout=timeout, headers=headers, stream=True, verify=True) as res:
+        if res.status_code == 304 and cached:
+            return {
+                "html": cached["html"],
+                "status_code": 304,
+                "content_type": cached["content_type"],
+                "from_cache": True,
+            }
+        res.raise_for_status()
+
+        content_type = res.headers.get("content-type", "")
+        if content_type and content_type.split(";")[0].strip().lower() not in HTML_CONTENT_TYPES:
+            raise UnsupportedContentType(f"Expected an HTML page but got {content_type}")
+
+        body = _read_capped(res, max_bytes)
+        html = body.decode(_charset(res, content_type), errors="replace")
+
+        etag = res.headers.get("etag")
+        last_modified = res.headers.get("last-modified")
+        if etag or last_modified:
+            http_cache.set(key, {
+                "html": html,
+                "content_type": content_type,
+                "etag": etag,
+                "last_modified": last_modified,
+            })
+
+        return {
+            "html": html,
+            "status_code": res.status_code,
+            "content_type": content_type,
+            "from_cache": False,
+        }